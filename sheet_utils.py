@@ -0,0 +1,56 @@
+import os
+import stat
+import tempfile
+
+import pandas as pd
+
+# Date formats tried against the first filled cell of each date column; UK day-first before pandas' own guess
+SHEET_DATE_FORMATS = ('ISO8601', '%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%y')
+
+# Access tokens and the lead copy are private to the account running the app, so they
+# live under the user's cache directory rather than the shared temp dir
+CACHE_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "joseph_mews")
+
+def parse_sheet_dates(column):
+    """Parse a date column with the first known format that fits its first filled cell"""
+    filled = column[column.astype(str).str.strip() != '']
+    if len(filled):
+        sample = str(filled.iloc[0]).strip()
+        for date_format in SHEET_DATE_FORMATS:
+            try:
+                pd.to_datetime([sample], format=date_format)
+            except ValueError:
+                continue
+            return pd.to_datetime(column, errors='coerce', format=date_format)
+
+    # Empty column or an unknown layout: let pandas infer
+    return pd.to_datetime(column, errors='coerce')
+
+def private_cache_dir():
+    """The per-user cache directory (created 0700), None if it is missing, shared or not ours"""
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        info = os.lstat(CACHE_DIR)
+    except OSError:
+        return None
+
+    # Never write through a symlink or into a directory other users can reach
+    if not stat.S_ISDIR(info.st_mode):
+        return None
+    if hasattr(os, "getuid") and (info.st_mode & 0o077 or info.st_uid != os.getuid()):
+        return None
+    return CACHE_DIR
+
+def write_private_file(directory, path, write):
+    """Write a 0600 file via a fresh temp file in `directory` and an atomic rename onto `path`"""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -1,19 +1,77 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import json
-from datetime import datetime
+import textwrap
+from datetime import datetime, timedelta, timezone
 import time
-import plotly.graph_objects as go
-import plotly.express as px
+from sheet_utils import CACHE_DIR, parse_sheet_dates, private_cache_dir, write_private_file
 
 try:
     import gspread
     from google.oauth2.service_account import Credentials
+    from google.auth.transport.requests import Request
+    from google.auth.exceptions import GoogleAuthError
+    from requests.exceptions import RequestException
     GOOGLE_SHEETS_AVAILABLE = True
 except ImportError:
     GOOGLE_SHEETS_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Text columns from the sheets are stored as Arrow strings
+pd.options.mode.string_storage = 'pyarrow'
+
+def cache_ttl_from_env(default=30):
+    """METRICS_CACHE_TTL from the environment, `default` when it is unset or not a positive integer"""
+    try:
+        ttl = int(os.getenv("METRICS_CACHE_TTL", default))
+    except ValueError:
+        return default
+    return ttl if ttl > 0 else default
+
+# How long loaded sheet data is reused before the next Sheets API refresh (seconds)
+METRICS_CACHE_TTL = cache_ttl_from_env()
+
+# Line traces switch from SVG to WebGL once a series gets this long
+WEBGL_POINT_THRESHOLD = 500
+
+# Single-line trend charts are downsampled (LTTB) to at most this many points
+LTTB_MAX_POINTS = 1000
+
+# Funnel progression series and their colours, plus the bottleneck bar colour scale
+METRICS_TO_PLOT = (
+    ('Total Leads', '#667eea'),
+    ('Qualified Leads', '#764ba2'),
+    ('Viewings Completed', '#f093fb'),
+    ('Offers Made', '#4facfe'),
+    ('Closed Sales', '#43e97b')
+)
+BOTTLENECK_SCALE = ('#ff4444', '#ffaa00', '#44ff44')
+
+# Shared chart margin, and the shared layout for the daily trend charts passed to Plotly as plain dict specs
+CHART_MARGIN = {'l': 20, 'r': 20, 't': 20, 'b': 20}
+DAILY_CHART_LAYOUT = {
+    'uirevision': 'keep',
+    'margin': CHART_MARGIN,
+    'xaxis': {'title': {'text': 'Date'}},
+    'hovermode': 'x unified',
+    'showlegend': False
+}
+DAILY_LINE_TRACE = {'mode': 'lines+markers', 'marker': {'size': 8}}
+
+# Small glance-only charts are drawn without hover, zoom or the mode bar
+STATIC_CHART_CONFIG = {'staticPlot': True, 'displayModeBar': False}
+
+# Service-account access tokens are reused across restarts until close to expiry
+TOKEN_CACHE_PATH = os.path.join(CACHE_DIR, "sa_token.json")
+TOKEN_EXPIRY_MARGIN = timedelta(minutes=5)
+
 # Page config
 st.set_page_config(
     page_title="Joseph Mews Lead Funnel Dashboard",
@@ -22,8 +80,8 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Custom CSS - Enhanced design
-st.markdown("""
+# Custom CSS - Enhanced design, one stylesheet for the whole app
+APP_CSS = """
 <style>
     /* Hide sidebar completely */
     [data-testid="stSidebar"] {
@@ -148,6 +206,79 @@ st.markdown("""
         font-weight: bold;
     }
 
+    /* Headline conversion rate */
+    .hero-wrap {
+        text-align: center;
+        margin: 2rem 0;
+    }
+
+    .hero {
+        display: inline-block;
+        padding: 1.5rem 3rem;
+        border-radius: 15px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.15);
+    }
+
+    .hero-label {
+        font-size: 1rem;
+        color: rgba(255,255,255,0.95);
+        margin-bottom: 0.5rem;
+        text-transform: uppercase;
+        letter-spacing: 0.5px;
+    }
+
+    .hero-value {
+        font-size: 3rem;
+        font-weight: bold;
+        color: white;
+    }
+
+    /* Summary cards */
+    .summary-cards {
+        display: flex;
+        flex-wrap: wrap;
+        gap: 1rem;
+    }
+
+    .summary-card {
+        flex: 1 1 0;
+        min-width: 120px;
+        padding: 1.5rem;
+        border-radius: 12px;
+        text-align: center;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.15);
+    }
+
+    .summary-card-label {
+        font-size: 0.85rem;
+        color: rgba(255,255,255,0.9);
+        margin-bottom: 0.5rem;
+        text-transform: uppercase;
+    }
+
+    .summary-card-value {
+        font-size: 2rem;
+        font-weight: bold;
+        color: white;
+    }
+
+    /* Performance targets */
+    .tgt {
+        padding: 0.75rem 1rem;
+        margin-bottom: 0.5rem;
+        border-radius: 8px;
+    }
+
+    .tgt.ok {
+        background: #d4edda;
+        color: #155724;
+    }
+
+    .tgt.fail {
+        background: #f8d7da;
+        color: #721c24;
+    }
+
     /* Last updated */
     .last-update {
         text-align: center;
@@ -179,6 +310,24 @@ st.markdown("""
         background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
     }
 
+    /* Stage conversion bars */
+    .progress-row {
+        margin-bottom: 1.25rem;
+    }
+
+    .progress-track {
+        height: 0.5rem;
+        margin-top: 0.4rem;
+        background: #f0f2f6;
+        border-radius: 0.25rem;
+        overflow: hidden;
+    }
+
+    .progress-fill {
+        height: 100%;
+        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
+    }
+
     /* Download button */
     .download-section {
         text-align: center;
@@ -221,7 +370,133 @@ st.markdown("""
         animation: fadeIn 0.5s ease-out;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# A style-only st.html goes to the event container, no markdown parsing or layout slot
+st.html(APP_CSS)
+
+# Flow chart row: four stage boxes joined by three conversion-rate arrows
+FLOW_ROW_TEMPLATE = textwrap.dedent("""
+    <div class="flow-container">
+        <div class="flow-metric">
+            <div class="flow-metric-label">{label1}</div>
+            <div class="flow-metric-value">{value1}</div>
+        </div>
+        <div class="flow-arrow">
+            <div class="flow-arrow-icon">→</div>
+            <div class="flow-arrow-rate">{rate1:.1f}%</div>
+        </div>
+        <div class="flow-metric">
+            <div class="flow-metric-label">{label2}</div>
+            <div class="flow-metric-value">{value2}</div>
+        </div>
+        <div class="flow-arrow">
+            <div class="flow-arrow-icon">→</div>
+            <div class="flow-arrow-rate">{rate2:.1f}%</div>
+        </div>
+        <div class="flow-metric">
+            <div class="flow-metric-label">{label3}</div>
+            <div class="flow-metric-value">{value3}</div>
+        </div>
+        <div class="flow-arrow">
+            <div class="flow-arrow-icon">→</div>
+            <div class="flow-arrow-rate">{rate3:.1f}%</div>
+        </div>
+        <div class="flow-metric">
+            <div class="flow-metric-label">{label4}</div>
+            <div class="flow-metric-value">{value4}</div>
+        </div>
+    </div>
+""")
+
+# Headline conversion figure under a flow chart
+HERO_TEMPLATE = textwrap.dedent("""
+    <div class="hero-wrap">
+        <div class="hero" style="background: {background};">
+            <div class="hero-label">{label}</div>
+            <div class="hero-value">{value:.1f}%</div>
+        </div>
+    </div>
+""")
+
+# One WhatsApp daily summary card, stage conversion bar and performance-target row
+SUMMARY_CARD_TEMPLATE = (
+    '<div class="summary-card" style="background: {background};">'
+    '<div class="summary-card-label">{label}</div>'
+    '<div class="summary-card-value">{value}</div>'
+    '</div>'
+)
+PROGRESS_ROW_TEMPLATE = (
+    '<div class="progress-row"><b>{name}</b>: {count} ({pct:.1f}%)'
+    '<div class="progress-track"><div class="progress-fill" style="width: {width:.1f}%;"></div></div>'
+    '</div>'
+)
+TARGET_ROW_TEMPLATE = '<div class="tgt {status}">{icon} {name}: {value:.1f}{unit} (Target: {target}{unit})</div>'
+
+LAST_UPDATE_TEMPLATE = textwrap.dedent("""
+    <div class="last-update">
+        🕐 Last updated: {ts}
+        <br>
+        <small>Use 🔄 button or Rerun from menu to refresh</small>
+    </div>
+""")
+
+FOOTER_HTML = textwrap.dedent("""
+    <div class="footer">
+        🔒 GDPR Compliant Dashboard • No Personal Data Stored or Displayed
+        <br>
+        Joseph Mews © 2024 • All Rights Reserved
+    </div>
+""")
+
+def parse_service_account_env(raw_json):
+    """Parse the GCP_SERVICE_ACCOUNT JSON, with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw_json)
+    return json.loads(raw_json)
+
+def load_cached_token(credentials):
+    """Reuse a persisted access token for this service account if it is still valid"""
+    if private_cache_dir() is None:
+        return False
+
+    # Any unreadable, foreign or malformed file is just a cache miss
+    try:
+        with open(TOKEN_CACHE_PATH) as f:
+            cached = json.load(f)
+        if not isinstance(cached, dict) or cached.get("client_email") != credentials.service_account_email:
+            return False
+        token = cached["token"]
+        expiry = datetime.fromisoformat(cached["expiry"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    if not isinstance(token, str) or not token:
+        return False
+
+    # google-auth keeps expiry as naive UTC
+    if expiry.tzinfo is not None or expiry - TOKEN_EXPIRY_MARGIN <= datetime.now(timezone.utc).replace(tzinfo=None):
+        return False
+
+    credentials.token = token
+    credentials.expiry = expiry
+    return True
+
+def store_token(credentials):
+    """Persist the current access token in the private cache directory, readable by the owner only"""
+    directory = private_cache_dir()
+    if directory is None:
+        return
+
+    payload = json.dumps({
+        "client_email": credentials.service_account_email,
+        "token": credentials.token,
+        "expiry": credentials.expiry.isoformat(),
+    }).encode()
+    try:
+        write_private_file(directory, TOKEN_CACHE_PATH, lambda f: f.write(payload))
+    except OSError:
+        # Token caching is best effort; the next start simply refreshes again
+        pass
 
 @st.cache_resource
 def get_google_sheets_client():
@@ -234,7 +509,7 @@ def get_google_sheets_client():
     try:
         # Try environment variables first
         if os.getenv("GCP_SERVICE_ACCOUNT"):
-            credentials_dict = json.loads(os.getenv("GCP_SERVICE_ACCOUNT"))
+            credentials_dict = parse_service_account_env(os.getenv("GCP_SERVICE_ACCOUNT"))
         elif os.getenv("GCP_SERVICE_ACCOUNT_PROJECT_ID"):
             credentials_dict = {
                 "type": os.getenv("GCP_SERVICE_ACCOUNT_TYPE", "service_account"),
@@ -252,7 +527,8 @@ def get_google_sheets_client():
             try:
                 if "gcp_service_account" in st.secrets:
                     credentials_dict = st.secrets["gcp_service_account"]
-            except:
+            except FileNotFoundError:
+                # No secrets.toml configured
                 pass
 
         if not credentials_dict:
@@ -265,75 +541,104 @@ def get_google_sheets_client():
                 "https://www.googleapis.com/auth/drive"
             ]
         )
+        if not load_cached_token(credentials):
+            credentials.refresh(Request())
+            store_token(credentials)
+
         client = gspread.authorize(credentials)
         return client
-    except Exception as e:
+    except (ValueError, KeyError, GoogleAuthError, RequestException) as e:
+        # Malformed service account info, or the token exchange failed
         st.error(f"Error connecting to Google Sheets: {e}")
         return None
 
-@st.cache_data(ttl=30)  # Refresh every 30 seconds
+def values_to_frame(values):
+    """DataFrame from a batchGet value range, first row as headers"""
+    if not values:
+        return pd.DataFrame()
+    header, rows = values[0], values[1:]
+    width = len(header)
+    # The API trims trailing empty cells, so short rows are padded back out
+    return pd.DataFrame([row[:width] + [''] * (width - len(row)) for row in rows], columns=header)
+
+def prepare_dated_frame(frame, count_columns, float_columns=(), tab="Daily"):
+    """Parse and sort the Date column and coerce numeric columns once per load"""
+    if 'Date' in frame.columns:
+        # One explicit format picked from the sheet skips per-row inference
+        filled = (frame['Date'].astype(str).str.strip() != '').sum()
+        frame['Date'] = parse_sheet_dates(frame['Date'])
+        frame = frame.dropna(subset=['Date']).sort_values('Date')
+
+        # Rows without a readable date are dropped; say so rather than letting the tab vanish
+        if filled and len(frame) * 2 < filled:
+            st.warning(f"{filled - len(frame)} of {filled} dates in the {tab} tab could not be read and were skipped")
+
+    # One coercion pass over all numeric columns; counts fit comfortably in int32
+    counts = frame.columns.intersection(count_columns, sort=False)
+    if len(counts):
+        frame[counts] = frame[counts].apply(pd.to_numeric, errors='coerce').fillna(0).astype('int32')
+
+    floats = frame.columns.intersection(float_columns, sort=False)
+    if len(floats):
+        frame[floats] = frame[floats].apply(pd.to_numeric, errors='coerce').fillna(0)
+
+    return frame
+
+@st.cache_data(ttl=METRICS_CACHE_TTL)
 def load_metrics_from_sheets(_client, spreadsheet_url):
     """Load metrics from Google Sheets - NO PERSONAL DATA"""
     try:
         sheet = _client.open_by_url(spreadsheet_url)
 
+        # Fetch every tab we need in one values.batchGet instead of a round trip per worksheet
+        available = {ws.title for ws in sheet.worksheets()}
+        wanted = [name for name in ("Metrics", "Daily", "WhatsApp") if name in available]
+        response = sheet.values_batch_get(
+            [f"'{name}'" for name in wanted],
+            params={'valueRenderOption': 'UNFORMATTED_VALUE', 'dateTimeRenderOption': 'FORMATTED_STRING'}
+        ) if wanted else {}
+        values = {
+            name: value_range.get('values', [])
+            for name, value_range in zip(wanted, response.get('valueRanges', []))
+        }
+
         # Load current metrics
-        worksheet = sheet.worksheet("Metrics")
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
+        df = values_to_frame(values.get("Metrics", []))
 
-        # Try to load daily data for trends
+        # Daily and WhatsApp tabs are optional, a malformed tab is skipped rather than failing the load
         daily_df = None
-        try:
-            daily_worksheet = sheet.worksheet("Daily")
-            daily_data = daily_worksheet.get_all_records()
-            daily_df = pd.DataFrame(daily_data)
-
-            # Convert Date column to datetime
-            if 'Date' in daily_df.columns:
-                daily_df['Date'] = pd.to_datetime(daily_df['Date'], errors='coerce')
-                daily_df = daily_df.dropna(subset=['Date'])
-                daily_df = daily_df.sort_values('Date')
-
-            # Convert numeric columns to numeric type
-            numeric_columns = ['Total Leads', 'Qualified Leads', 'Viewings Scheduled',
-                             'Viewings Completed', 'Offers Made', 'Offers Accepted',
-                             'Closed Sales', 'Daily Budget']
-            for col in numeric_columns:
-                if col in daily_df.columns:
-                    daily_df[col] = pd.to_numeric(daily_df[col], errors='coerce').fillna(0)
-        except:
-            # Daily sheet doesn't exist yet
-            pass
-
-        # Try to load WhatsApp metrics
+        if "Daily" in values:
+            try:
+                daily_df = prepare_dated_frame(values_to_frame(values["Daily"]), [
+                    'Total Leads', 'Qualified Leads', 'Viewings Scheduled',
+                    'Viewings Completed', 'Offers Made', 'Offers Accepted',
+                    'Closed Sales'
+                ], float_columns=['Daily Budget'])
+                # Arrow-backed columns aggregate faster and hand off to Streamlit without conversion
+                daily_df = daily_df.convert_dtypes(dtype_backend='pyarrow')
+            except (ValueError, TypeError):
+                daily_df = None
+
         whatsapp_df = None
-        try:
-            whatsapp_worksheet = sheet.worksheet("WhatsApp")
-            whatsapp_data = whatsapp_worksheet.get_all_records()
-            whatsapp_df = pd.DataFrame(whatsapp_data)
-
-            # Convert Date column to datetime
-            if 'Date' in whatsapp_df.columns:
-                whatsapp_df['Date'] = pd.to_datetime(whatsapp_df['Date'], errors='coerce')
-                whatsapp_df = whatsapp_df.dropna(subset=['Date'])
-                whatsapp_df = whatsapp_df.sort_values('Date')
-
-            # Convert numeric columns to numeric type
-            numeric_columns = ['Messages Answered', 'Positive', 'Negative',
-                             'Relevant', 'Irrelevant', 'Scheduled Leads']
-            for col in numeric_columns:
-                if col in whatsapp_df.columns:
-                    whatsapp_df[col] = pd.to_numeric(whatsapp_df[col], errors='coerce').fillna(0)
-        except:
-            # WhatsApp sheet doesn't exist yet
-            pass
+        if "WhatsApp" in values:
+            try:
+                whatsapp_df = prepare_dated_frame(values_to_frame(values["WhatsApp"]), [
+                    'Messages Answered', 'Positive', 'Negative',
+                    'Relevant', 'Irrelevant', 'Scheduled Leads'
+                ], tab="WhatsApp").convert_dtypes(dtype_backend='pyarrow')
+            except (ValueError, TypeError):
+                whatsapp_df = None
 
         return df, daily_df, whatsapp_df, datetime.now()
-    except Exception as e:
+    except (gspread.exceptions.GSpreadException, GoogleAuthError, RequestException, KeyError, ValueError) as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame(), None, None, None
 
+def frame_digest(frame):
+    """Cheap content key for a DataFrame: column names plus a row hash"""
+    return (tuple(frame.columns), pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: frame_digest})
 def calculate_metrics(df):
     """Calculate sales funnel metrics"""
     if df.empty or 'Stage' not in df.columns or 'Count' not in df.columns:
@@ -347,40 +652,45 @@ def calculate_metrics(df):
             'Closed Sales': 0
         }
 
-    metrics = {}
-    for _, row in df.iterrows():
-        stage = row['Stage']
-        count = row['Count']
-        metrics[stage] = int(count)
+    return dict(zip(df['Stage'].tolist(), df['Count'].astype('int64', copy=False).tolist()))
 
-    return metrics
+def conversion_rates(from_counts, to_counts):
+    """Vectorized to/from ratios for a set of funnel stages, 0 where the source stage is empty"""
+    from_counts = np.asarray(from_counts, dtype=np.float64)
+    to_counts = np.asarray(to_counts, dtype=np.float64)
+    return np.divide(to_counts, from_counts, out=np.zeros_like(to_counts), where=from_counts > 0)
 
 def calculate_bottleneck(metrics):
     """Identify the biggest bottleneck in the funnel"""
-    conversion_stages = [
-        ('Lead → Qualified', metrics.get('Total Leads', 0), metrics.get('Qualified Leads', 0)),
-        ('Qualified → Viewing', metrics.get('Qualified Leads', 0), metrics.get('Viewings Completed', 0)),
-        ('Viewing → Offer', metrics.get('Viewings Completed', 0), metrics.get('Offers Made', 0)),
-        ('Offer → Accepted', metrics.get('Offers Made', 0), metrics.get('Offers Accepted', 0)),
-        ('Accepted → Closed', metrics.get('Offers Accepted', 0), metrics.get('Closed Sales', 0)),
+    stage_names = [
+        'Lead → Qualified',
+        'Qualified → Viewing',
+        'Viewing → Offer',
+        'Offer → Accepted',
+        'Accepted → Closed',
+    ]
+    funnel = [metrics.get(stage, 0) for stage in (
+        'Total Leads', 'Qualified Leads', 'Viewings Completed',
+        'Offers Made', 'Offers Accepted', 'Closed Sales'
+    )]
+    from_counts = np.array(funnel[:-1], dtype=np.int64)
+    to_counts = np.array(funnel[1:], dtype=np.int64)
+    rates = conversion_rates(from_counts, to_counts) * 100
+
+    # Order by conversion rate (lowest = biggest bottleneck), stages with no leads in sort last and are dropped
+    order = np.argsort(np.where(from_counts > 0, rates, np.inf), kind='stable')
+
+    return [
+        {
+            'stage': stage_names[i],
+            'rate': float(rates[i]),
+            'drop_off': int(from_counts[i] - to_counts[i]),
+            'from': int(from_counts[i]),
+            'to': int(to_counts[i])
+        }
+        for i in order.tolist()
+        if from_counts[i] > 0
     ]
-
-    bottlenecks = []
-    for stage_name, from_count, to_count in conversion_stages:
-        if from_count > 0:
-            conversion_rate = (to_count / from_count) * 100
-            drop_off = from_count - to_count
-            bottlenecks.append({
-                'stage': stage_name,
-                'rate': conversion_rate,
-                'drop_off': drop_off,
-                'from': from_count,
-                'to': to_count
-            })
-
-    # Sort by conversion rate (lowest = biggest bottleneck)
-    bottlenecks.sort(key=lambda x: x['rate'])
-    return bottlenecks
 
 def calculate_projections(metrics):
     """Calculate projected outcomes based on current conversion rates"""
@@ -388,54 +698,700 @@ def calculate_projections(metrics):
     if total == 0:
         return {}
 
-    # Current rates
-    qual_rate = metrics.get('Qualified Leads', 0) / total
-    viewing_rate = metrics.get('Viewings Completed', 0) / total
-    offer_rate = metrics.get('Offers Made', 0) / total
-    close_rate = metrics.get('Closed Sales', 0) / total
+    # Current rates, all relative to total leads
+    stage_counts = [metrics.get(stage, 0) for stage in (
+        'Qualified Leads', 'Viewings Completed', 'Offers Made', 'Closed Sales'
+    )]
+    rates = conversion_rates([total] * len(stage_counts), stage_counts)
+    close_rate = rates[3]
 
     # Projections for next 100 leads
     projection_input = 100
+    projected = (projection_input * rates).astype(np.int64)
+
+    # What if scenarios: qualification or viewing rate up 10% (capped at 100%)
+    base = rates[:2]
+    improved = projection_input * np.minimum(base * 1.1, 1.0) * close_rate
+    what_if = np.divide(improved, base, out=np.zeros_like(base), where=base > 0).astype(np.int64)
 
     projections = {
         'input_leads': projection_input,
-        'projected_qualified': int(projection_input * qual_rate),
-        'projected_viewings': int(projection_input * viewing_rate),
-        'projected_offers': int(projection_input * offer_rate),
-        'projected_closed': int(projection_input * close_rate),
-        'current_close_rate': close_rate * 100
+        'projected_qualified': int(projected[0]),
+        'projected_viewings': int(projected[1]),
+        'projected_offers': int(projected[2]),
+        'projected_closed': int(projected[3]),
+        'current_close_rate': float(close_rate * 100),
+        'if_qual_improves_10': int(what_if[0]),
+        'if_viewing_improves_10': int(what_if[1])
     }
-
-    # What if scenarios
-    projections['if_qual_improves_10'] = int(projection_input * min(qual_rate * 1.1, 1.0) * close_rate / qual_rate) if qual_rate > 0 else 0
-    projections['if_viewing_improves_10'] = int(projection_input * close_rate / viewing_rate * min(viewing_rate * 1.1, 1.0)) if viewing_rate > 0 else 0
+    projections['delta_qual_10'] = projections['if_qual_improves_10'] - projections['projected_closed']
+    projections['delta_view_10'] = projections['if_viewing_improves_10'] - projections['projected_closed']
 
     return projections
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def funnel_progression_json(data_key, _frame):
+    """Plotly JSON for the funnel progression chart, None when there is nothing to plot"""
+    present = list(pd.Index([name for name, _ in METRICS_TO_PLOT]).intersection(_frame.columns, sort=False))
+
+    # Skip Plotly entirely when no funnel column has any counts in range
+    if not present or _frame[present].fillna(0).to_numpy(dtype=np.float64).sum() == 0:
+        return None
+
+    import plotly.graph_objects as go
+
+    # Long ranges keep one shared LTTB subset of days, picked on the summed funnel counts
+    if len(_frame) > LTTB_MAX_POINTS:
+        funnel_totals = _frame[present].fillna(0).to_numpy(dtype=np.float64).sum(axis=1)
+        _frame = _frame.iloc[lttb_indices(_frame['Date'].to_numpy(dtype='datetime64[ns]'), funnel_totals, LTTB_MAX_POINTS)]
+
+    trace_type = 'scattergl' if len(_frame) > WEBGL_POINT_THRESHOLD else 'scatter'
+    # Explicit dtypes: Arrow-backed columns would otherwise come out as object arrays on pandas 2.x
+    dates = _frame['Date'].to_numpy(dtype='datetime64[ns]')
+    colors = dict(METRICS_TO_PLOT)
+
+    # The whole figure as one dict spec, validated once instead of per trace and layout update
+    fig = go.Figure(dict(
+        data=[
+            dict(
+                type=trace_type, x=dates, y=_frame[name].to_numpy(dtype=np.int64), name=name, mode='lines+markers',
+                line=dict(color=colors[name], width=2), marker=dict(size=6)
+            )
+            for name in present
+        ],
+        layout=dict(
+            uirevision='keep',
+            height=400,
+            margin=dict(l=20, r=20, t=20, b=60),
+            xaxis=dict(title=dict(text="Date")),
+            yaxis=dict(title=dict(text="Count")),
+            hovermode='x unified',
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=-0.3,
+                xanchor="center",
+                x=0.5
+            )
+        )
+    ))
+
+    return fig.to_plotly_json()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def bottleneck_chart_json(bottlenecks):
+    """Plotly JSON for the conversion-stage bar chart"""
+    import plotly.graph_objects as go
+
+    # A single horizontal go.Bar, no DataFrame or Plotly Express pipeline for a handful of stages
+    stages = [b['stage'] for b in bottlenecks]
+    rates = np.fromiter((b['rate'] for b in bottlenecks), dtype=np.float64, count=len(bottlenecks))
+
+    fig = go.Figure(go.Bar(
+        x=rates,
+        y=stages,
+        orientation='h',
+        marker=dict(
+            color=rates,
+            colorscale=list(BOTTLENECK_SCALE),
+            colorbar=dict(title=dict(text='Conversion Rate (%)'))
+        ),
+        text=rates,
+        texttemplate='%{text:.1f}%',
+        textposition='outside',
+        hovertemplate='Stage=%{y}<br>Conversion Rate (%)=%{x}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        uirevision='keep',
+        height=300,
+        showlegend=False,
+        margin=CHART_MARGIN,
+        xaxis_title='Conversion Rate (%)',
+        yaxis_title='Stage'
+    )
+
+    return fig.to_plotly_json()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def funnel_chart_json(stages, counts):
+    """Plotly JSON for the lead funnel chart"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Funnel(
+        y=list(stages),
+        x=list(counts),
+        textposition="inside",
+        textinfo="value+percent initial",
+        marker={
+            "color": ["#667eea", "#764ba2", "#f093fb", "#4facfe", "#00f2fe", "#43e97b"],
+            "line": {"width": 2, "color": "white"}
+        },
+        connector={"line": {"color": "#667eea", "dash": "dot", "width": 3}}
+    ))
+
+    fig.update_layout(
+        uirevision='keep',
+        height=500,
+        margin=CHART_MARGIN,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(size=14, color='#333')
+    )
+
+    return fig.to_plotly_json()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def whatsapp_trends_json(data_key, _frame):
+    """Plotly JSON for the 2x2 WhatsApp daily trend panels"""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    # All four trend panels in one figure, a single chart payload instead of four
+    # Plain arrays per column, missing columns share one zeros array
+    available = set(_frame.columns)
+    wa_zeros = np.zeros(len(_frame), dtype=np.int64)
+    wa_dates = _frame['Date'].to_numpy(dtype='datetime64[ns]')
+    wa = {
+        name: _frame[name].to_numpy(dtype=np.int64) if name in available else wa_zeros
+        for name in ('Messages Answered', 'Positive', 'Negative', 'Relevant', 'Irrelevant', 'Scheduled Leads')
+    }
+
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=("Messages Answered", "Positive vs Negative", "Relevant vs Irrelevant", "Scheduled Leads"),
+        vertical_spacing=0.15,
+        horizontal_spacing=0.08
+    )
+
+    fig.add_trace(go.Scatter(
+        x=wa_dates,
+        y=wa['Messages Answered'],
+        mode='lines+markers',
+        name='Messages Answered',
+        line=dict(color='#25D366', width=3),
+        marker=dict(size=8),
+        fill='tozeroy',
+        fillcolor='rgba(37, 211, 102, 0.1)',
+        showlegend=False
+    ), row=1, col=1)
+
+    fig.add_trace(go.Bar(
+        x=wa_dates,
+        y=wa['Positive'],
+        name='Positive',
+        marker=dict(color='#43e97b')
+    ), row=1, col=2)
+
+    fig.add_trace(go.Bar(
+        x=wa_dates,
+        y=wa['Negative'],
+        name='Negative',
+        marker=dict(color='#ff6b6b')
+    ), row=1, col=2)
+
+    fig.add_trace(go.Bar(
+        x=wa_dates,
+        y=wa['Relevant'],
+        name='Relevant',
+        marker=dict(color='#667eea')
+    ), row=2, col=1)
+
+    fig.add_trace(go.Bar(
+        x=wa_dates,
+        y=wa['Irrelevant'],
+        name='Irrelevant',
+        marker=dict(color='#f093fb')
+    ), row=2, col=1)
+
+    fig.add_trace(go.Scatter(
+        x=wa_dates,
+        y=wa['Scheduled Leads'],
+        mode='lines+markers',
+        name='Scheduled Leads',
+        line=dict(color='#4facfe', width=3),
+        marker=dict(size=8),
+        fill='tozeroy',
+        fillcolor='rgba(79, 172, 254, 0.1)',
+        showlegend=False
+    ), row=2, col=2)
+
+    fig.update_yaxes(title_text="Messages", row=1, col=1)
+    fig.update_yaxes(title_text="Messages", row=1, col=2)
+    fig.update_yaxes(title_text="Messages", row=2, col=1)
+    fig.update_yaxes(title_text="Leads", row=2, col=2)
+    fig.update_xaxes(title_text="Date", row=2)
+
+    fig.update_layout(
+        uirevision='keep',
+        height=620,
+        margin=dict(l=20, r=20, t=40, b=20),
+        hovermode='x unified',
+        barmode='group',
+        legend=dict(orientation="h", yanchor="bottom", y=1.06, xanchor="right", x=1)
+    )
+
+    return fig.to_plotly_json()
+
+def lttb_indices(x, y, threshold):
+    """Indices of a Largest-Triangle-Three-Buckets downsample of (x, y) to `threshold` points"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    x = x.astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # First and last points are kept, the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return selected
+
+def render_metric_cards(cards):
+    """Render (label, value, background) summary cards as one flex row in a single st.html call"""
+    html_parts = ['<div class="summary-cards">']
+    for label, value, background in cards:
+        html_parts.append(SUMMARY_CARD_TEMPLATE.format(label=label, value=value, background=background))
+    html_parts.append('</div>')
+    st.html(''.join(html_parts))
+
+@st.fragment
+def render_daily_trends(daily_df):
+    """Daily trend charts with their own date-range filter"""
+    st.markdown("---")
+    st.subheader("📅 Daily Lead Trends")
+
+    # Dates arrive sorted from the loader, so the bounds are the ends of one datetime64 array
+    date_values = daily_df['Date'].to_numpy(dtype='datetime64[ns]')
+    min_date = date_values[0].astype('datetime64[D]').item()
+    max_date = date_values[-1].astype('datetime64[D]').item()
+
+    # Date range filter
+    col1, col2, col3 = st.columns([2, 2, 3])
+
+    with col1:
+        start_date = st.date_input("From", value=min_date, min_value=min_date, max_value=max_date)
+
+    with col2:
+        end_date = st.date_input("To", value=max_date, min_value=min_date, max_value=max_date)
+
+    with col3:
+        st.markdown("##### Quick Filters")
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            if st.button("Last 7 Days"):
+                start_date = max_date - pd.Timedelta(days=7)
+        with col_b:
+            if st.button("Last 30 Days"):
+                start_date = max_date - pd.Timedelta(days=30)
+        with col_c:
+            if st.button("All Time"):
+                start_date = min_date
+
+    # Filter data by date range, a binary search on the sorted dates instead of a per-row .dt.date mask
+    first = np.searchsorted(date_values, np.datetime64(start_date, 'D'), side='left')
+    stop = np.searchsorted(date_values, np.datetime64(end_date, 'D') + np.timedelta64(1, 'D'), side='left')
+    filtered_daily = daily_df.iloc[first:stop]
+
+    if not filtered_daily.empty:
+        # SVG scatter traces get sluggish on long histories, use WebGL instead
+        scatter_type = 'scattergl' if len(filtered_daily) > WEBGL_POINT_THRESHOLD else 'scatter'
+
+        # Pull the plotted columns out as plain arrays once, Plotly strips the Series anyway
+        available = set(filtered_daily.columns)
+        zeros = np.zeros(len(filtered_daily), dtype=np.int64)
+        date_arr = filtered_daily['Date'].to_numpy(dtype='datetime64[ns]')
+        total_leads_arr = filtered_daily['Total Leads'].to_numpy(dtype=np.int64) if 'Total Leads' in available else zeros
+        closed_arr = filtered_daily['Closed Sales'].to_numpy(dtype=np.int64) if 'Closed Sales' in available else zeros
+
+        # Period totals are summed once and shared by the stats and budget panels
+        day_count = len(filtered_daily)
+        leads_total = int(total_leads_arr.sum())
+        sales_total = int(closed_arr.sum())
+
+        # Long histories send a shape-preserving subset of the line points to the browser
+        leads_idx = lttb_indices(date_arr, total_leads_arr, LTTB_MAX_POINTS)
+
+        # Daily totals line chart
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("#### 📊 Daily Total Leads")
+
+            fig = {
+                'data': [{
+                    'type': scatter_type,
+                    'x': date_arr[leads_idx],
+                    'y': total_leads_arr[leads_idx],
+                    'name': 'Total Leads',
+                    'line': {'color': '#667eea', 'width': 3},
+                    'fill': 'tozeroy',
+                    'fillcolor': 'rgba(102, 126, 234, 0.1)',
+                    **DAILY_LINE_TRACE
+                }],
+                'layout': {**DAILY_CHART_LAYOUT, 'height': 350, 'yaxis': {'title': {'text': 'Leads'}}}
+            }
+
+            st.plotly_chart(fig, use_container_width=True, key="daily_total_leads")
+
+            # Daily stats
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.metric("Total in Period", leads_total)
+            with col_b:
+                st.metric("Daily Average", f"{leads_total / day_count:.1f}")
+
+        with col2:
+            st.markdown("#### 🎯 Daily Closed Sales")
+
+            fig = {
+                'data': [{
+                    'type': 'bar',
+                    'x': date_arr,
+                    'y': closed_arr,
+                    'name': 'Closed Sales',
+                    'marker': {'color': '#43e97b', 'line': {'color': 'white', 'width': 1}}
+                }],
+                'layout': {**DAILY_CHART_LAYOUT, 'height': 350, 'yaxis': {'title': {'text': 'Sales'}}}
+            }
+
+            st.plotly_chart(fig, use_container_width=True, key="daily_closed_sales")
+
+            # Sales stats
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.metric("Total Sales", sales_total)
+            with col_b:
+                st.metric("Daily Average", f"{sales_total / day_count:.1f}")
+
+        # Budget Analysis (if budget column exists)
+        if 'Daily Budget' in available:
+            budget_arr = filtered_daily['Daily Budget'].to_numpy(dtype=np.float64)
+
+            st.markdown("---")
+            st.markdown("#### 💰 Budget & Cost Analysis")
+
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                st.markdown("##### 📊 Daily Budget vs Leads")
+
+                fig = {
+                    'data': [
+                        # Budget bars
+                        {
+                            'type': 'bar',
+                            'x': date_arr,
+                            'y': budget_arr,
+                            'name': 'Daily Budget',
+                            'marker': {'color': 'rgba(102, 126, 234, 0.6)'},
+                            'yaxis': 'y'
+                        },
+                        # Leads line
+                        {
+                            'type': scatter_type,
+                            'x': date_arr[leads_idx],
+                            'y': total_leads_arr[leads_idx],
+                            'name': 'Total Leads',
+                            'line': {'color': '#43e97b', 'width': 3},
+                            'marker': {'size': 8},
+                            'yaxis': 'y2'
+                        }
+                    ],
+                    'layout': {
+                        **DAILY_CHART_LAYOUT,
+                        'height': 300,
+                        'yaxis': {'title': {'text': 'Budget (£)'}, 'side': 'left'},
+                        'yaxis2': {'title': {'text': 'Leads'}, 'side': 'right', 'overlaying': 'y'},
+                        'showlegend': True,
+                        'legend': {'orientation': 'h', 'yanchor': 'bottom', 'y': 1.02, 'xanchor': 'right', 'x': 1}
+                    }
+                }
+
+                st.plotly_chart(fig, use_container_width=True, key="budget_vs_leads")
+
+            with col2:
+                st.markdown("##### 💸 Cost Per Lead")
+
+                # Calculate cost per lead in one vectorised divide, zero on days without leads
+                cost_arr = np.divide(
+                    budget_arr, total_leads_arr,
+                    out=np.zeros(len(budget_arr), dtype=np.float64),
+                    where=total_leads_arr > 0
+                )
+                cost_idx = lttb_indices(date_arr, cost_arr, LTTB_MAX_POINTS)
+
+                fig = {
+                    'data': [{
+                        'type': scatter_type,
+                        'x': date_arr[cost_idx],
+                        'y': cost_arr[cost_idx],
+                        'name': 'Cost Per Lead',
+                        'line': {'color': '#f093fb', 'width': 3},
+                        'fill': 'tozeroy',
+                        'fillcolor': 'rgba(240, 147, 251, 0.1)',
+                        **DAILY_LINE_TRACE
+                    }],
+                    'layout': {**DAILY_CHART_LAYOUT, 'height': 300, 'yaxis': {'title': {'text': 'Cost (£)'}}}
+                }
+
+                st.plotly_chart(fig, use_container_width=True, config=STATIC_CHART_CONFIG, key="cost_per_lead")
+
+                # Average cost per lead
+                avg_cost = cost_arr.mean()
+                st.metric("Avg Cost Per Lead", f"£{avg_cost:.2f}")
+
+            with col3:
+                st.markdown("##### 📈 Budget Efficiency")
+
+                # Calculate efficiency metrics
+                total_budget = budget_arr.sum()
+
+                overall_cost_per_lead = total_budget / leads_total if leads_total > 0 else 0
+                cost_per_sale = total_budget / sales_total if sales_total > 0 else 0
+
+                st.metric("Total Budget", f"£{total_budget:,.0f}")
+                st.metric("Cost Per Lead", "£%.2f" % overall_cost_per_lead)
+                st.metric("Cost Per Sale", "£%.2f" % cost_per_sale)
+
+                # Efficiency score
+                if overall_cost_per_lead > 0:
+                    efficiency = (1 / overall_cost_per_lead) * 100
+                    st.metric("Efficiency Score", "%.1f" % efficiency)
+
+        # Multi-line funnel progression
+        st.markdown("---")
+        st.markdown("#### 📈 Funnel Progression Over Time")
+
+        # Only rebuild the figure when the filtered rows change
+        data_key = frame_digest(filtered_daily)
+        fig = funnel_progression_json(data_key, filtered_daily)
+
+        if fig is None:
+            st.info("No funnel data in range")
+        else:
+            st.plotly_chart(fig, use_container_width=True, key="funnel_progression")
+    else:
+        st.warning("No data available for selected date range")
+
+@st.fragment
+def render_bottleneck_analysis(metrics):
+    """Weakest funnel conversion and all stage conversion rates"""
+    st.markdown("---")
+    st.subheader("🔴 Bottleneck Analysis")
+
+    bottlenecks = calculate_bottleneck(metrics)
+
+    if bottlenecks:
+        # Highlight the biggest bottleneck
+        worst = bottlenecks[0]
+
+        col1, col2 = st.columns([2, 3])
+
+        with col1:
+            st.error(f"### 🚨 Critical Bottleneck")
+            st.markdown(
+                f"**{worst['stage']}**\n"
+                f"- Conversion Rate: **{worst['rate']:.1f}%**\n"
+                f"- Drop-off: **{worst['drop_off']}** leads\n"
+                f"- From: {worst['from']} → To: {worst['to']}"
+            )
+
+            # Recommendation
+            if worst['rate'] < 50:
+                st.warning("⚠️ **Action Needed:** Focus improvement efforts here for maximum impact!")
+
+        with col2:
+            st.markdown("#### All Conversion Stages")
+
+            # Create bar chart for all stages
+            st.plotly_chart(bottleneck_chart_json(bottlenecks), use_container_width=True, key="bottleneck_stages")
+
+@st.fragment
+def render_projections(metrics):
+    """Next-100-leads projection and what-if scenarios"""
+    st.markdown("---")
+    st.subheader("🔮 Projections & Forecasting")
+
+    projections = calculate_projections(metrics)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("#### 📊 Next 100 Leads Projection")
+        st.markdown("*Based on current conversion rates*")
+
+        proj_df = pd.DataFrame({
+            'Stage': ['Qualified', 'Viewings', 'Offers', 'Closed Sales'],
+            'Expected': [
+                projections['projected_qualified'],
+                projections['projected_viewings'],
+                projections['projected_offers'],
+                projections['projected_closed']
+            ],
+            'Note': ['', '', '', f"{projections['current_close_rate']:.1f}% close rate"]
+        })
+        st.dataframe(proj_df, hide_index=True, use_container_width=True)
+
+    with col2:
+        st.markdown("#### 🎯 What-If Scenarios")
+        st.markdown("*Impact of 10% improvement*")
+
+        st.info(f"**If Qualification improves by 10%:**")
+        st.write(f"Closed Sales: {projections['if_qual_improves_10']} (+{projections['delta_qual_10']})")
+
+        st.info(f"**If Viewing Conversion improves by 10%:**")
+        st.write(f"Closed Sales: {projections['if_viewing_improves_10']} (+{projections['delta_view_10']})")
+
+        st.success("💡 **Tip:** Focus on the bottleneck stage for maximum ROI")
+
+@st.fragment
+def render_pipeline_and_targets(metrics, show_pipeline, show_targets):
+    """Pipeline health metrics and performance targets"""
+    # Read each metric once
+    total = metrics.get('Total Leads', 0)
+    qual = metrics.get('Qualified Leads', 0)
+    views_scheduled = metrics.get('Viewings Scheduled', 0)
+    views = metrics.get('Viewings Completed', 0)
+    offers = metrics.get('Offers Made', 0)
+    accepted = metrics.get('Offers Accepted', 0)
+    closed = metrics.get('Closed Sales', 0)
+
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+
+    if show_pipeline:
+        with col1:
+            st.markdown("#### 📊 Pipeline Health")
+            # The three pipeline figures as one card row instead of a metric widget each
+            render_metric_cards([
+                ("In Viewings", views_scheduled + views, "linear-gradient(135deg, #f093fb 0%, #f5576c 100%)"),
+                ("In Negotiation", offers + accepted, "linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)"),
+                ("Ready to Close", accepted, "linear-gradient(135deg, #43e97b 0%, #38f9d7 100%)"),
+            ])
+
+    if show_targets:
+        with col2:
+            st.markdown("#### 🎯 Performance Targets")
+
+            # All three target rates in one vectorised divide, 0 where the source stage is empty
+            qualified_rate, close_rate, viewing_to_offer = conversion_rates(
+                [total, total, views],
+                [qual, closed, offers]
+            ) * 100
+
+            # Calculate if targets are being met (example thresholds)
+            targets = (
+                ("Qualification Rate", qualified_rate, 30, "%"),
+                ("Close Rate", close_rate, 5, "%"),
+                ("Viewing Conversion", viewing_to_offer, 40, "%")
+            )
+
+            # One markdown block for all targets instead of a callout each
+            rows = []
+            for metric_name, value, target, unit in targets:
+                status, icon = ("ok", "✅") if value >= target else ("fail", "❌")
+                rows.append(TARGET_ROW_TEMPLATE.format(
+                    status=status, icon=icon, name=metric_name, value=value, target=target, unit=unit
+                ))
+            st.html("\n".join(rows))
+
+@st.fragment
+def render_whatsapp(whatsapp_df):
+    """WhatsApp conversion flow, daily summary cards and trend charts"""
+    st.markdown("---")
+    st.subheader("💬 WhatsApp Metrics")
+
+    # Latest day as a plain dict, the field lookups below skip the Series index
+    latest_whatsapp = whatsapp_df.iloc[-1].to_dict()
+
+    # Calculate conversion rates
+    messages_answered = latest_whatsapp.get('Messages Answered', 0)
+    relevant = latest_whatsapp.get('Relevant', 0)
+    positive = latest_whatsapp.get('Positive', 0)
+    scheduled = latest_whatsapp.get('Scheduled Leads', 0)
+
+    # Conversion rates
+    answered_to_relevant = (relevant / messages_answered * 100) if messages_answered > 0 else 0
+    relevant_to_positive = (positive / relevant * 100) if relevant > 0 else 0
+    positive_to_scheduled = (scheduled / positive * 100) if positive > 0 else 0
+    overall_conversion = (scheduled / messages_answered * 100) if messages_answered > 0 else 0
+
+    # WhatsApp Flow Chart
+    st.markdown("### 📊 WhatsApp Conversion Flow")
+
+    st.html(
+        FLOW_ROW_TEMPLATE.format_map(dict(
+            label1="Messages Answered", value1=int(messages_answered),
+            rate1=answered_to_relevant,
+            label2="Relevant", value2=int(relevant),
+            rate2=relevant_to_positive,
+            label3="Positive", value3=int(positive),
+            rate3=positive_to_scheduled,
+            label4="Scheduled Leads", value4=int(scheduled),
+        ))
+        + HERO_TEMPLATE.format(
+            label="Overall Conversion Rate", value=overall_conversion,
+            background="linear-gradient(135deg, #25D366 0%, #128C7E 100%)"
+        )
+    )
+
+    # Summary cards in columns
+    st.markdown("---")
+    st.markdown("#### 📈 Daily Summary")
+
+    render_metric_cards([
+        ("Answered", int(messages_answered), "linear-gradient(135deg, #25D366 0%, #128C7E 100%)"),
+        ("Positive", int(positive), "linear-gradient(135deg, #43e97b 0%, #38f9d7 100%)"),
+        ("Negative", int(latest_whatsapp.get('Negative', 0)), "linear-gradient(135deg, #ff6b6b 0%, #ee5a6f 100%)"),
+        ("Relevant", int(relevant), "linear-gradient(135deg, #667eea 0%, #764ba2 100%)"),
+        ("Irrelevant", int(latest_whatsapp.get('Irrelevant', 0)), "linear-gradient(135deg, #f093fb 0%, #f5576c 100%)"),
+        ("Scheduled", int(scheduled), "linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)"),
+    ])
+
+    # Daily trends for WhatsApp
+    st.markdown("---")
+    st.markdown("#### 📊 WhatsApp Daily Trends")
+
+    # Only rebuild the figure when the sheet rows change
+    fig = whatsapp_trends_json(frame_digest(whatsapp_df), whatsapp_df)
+    st.plotly_chart(fig, use_container_width=True, config=STATIC_CHART_CONFIG, key="whatsapp_trends")
+
 def main():
     # Logo and Header
-    st.markdown('''
+    st.html('''
     <div class="logo-container">
         <h1 class="logo-text">Joseph Mews</h1>
     </div>
-    ''', unsafe_allow_html=True)
+    ''')
 
-    st.markdown('<h2 class="main-header">Lead Funnel Dashboard</h2>', unsafe_allow_html=True)
+    st.html('<h2 class="main-header">Lead Funnel Dashboard</h2>')
 
-    # Subtitle with refresh button
-    col1, col2, col3 = st.columns([2, 3, 2])
-    with col1:
-        st.markdown("")  # Empty space
-    with col2:
-        subcol1, subcol2 = st.columns([0.5, 6])
-        with subcol1:
-            if st.button("🔄", help="Refresh Data", key="refresh_btn"):
-                st.cache_data.clear()
-                st.rerun()
-        with subcol2:
-            st.markdown('<p class="subtitle" style="margin-top: 0.3rem;">Real-time Sales Funnel Metrics • GDPR Compliant</p>', unsafe_allow_html=True)
-    with col3:
-        st.markdown("")  # Empty space
+    # Subtitle with refresh button, one row; the outer columns are left empty as margins
+    _, col_refresh, col_subtitle, _ = st.columns([2, 0.23, 2.77, 2])
+    with col_refresh:
+        if st.button("🔄", help="Refresh Data", key="refresh_btn"):
+            st.cache_data.clear()
+            st.rerun()
+    with col_subtitle:
+        st.html('<p class="subtitle" style="margin-top: 0.3rem;">Real-time Sales Funnel Metrics • GDPR Compliant</p>')
 
     # Filters in an expander
     with st.expander("⚙️ Dashboard Settings", expanded=False):
@@ -452,6 +1408,7 @@ def main():
         with col3:
             show_targets = st.checkbox("Show Performance Targets", value=True)
             show_pipeline = st.checkbox("Show Pipeline Health", value=True)
+            show_whatsapp = st.checkbox("Show WhatsApp Metrics", value=True)
 
     # Get Google Sheets URL from environment variable
     spreadsheet_url = os.getenv("GOOGLE_SHEETS_URL")
@@ -483,6 +1440,10 @@ def main():
 
         df, daily_df, whatsapp_df, last_update = load_metrics_from_sheets(client, spreadsheet_url)
 
+    # Optional tabs, checked once
+    has_daily = daily_df is not None and len(daily_df) > 0
+    has_whatsapp = whatsapp_df is not None and len(whatsapp_df) > 0
+
     if df.empty:
         st.error("No data found. Check your Google Sheets and ensure 'Metrics' worksheet exists.")
         st.info("""
@@ -519,95 +1480,45 @@ def main():
     offers_accepted = metrics.get('Offers Accepted', 0)
     closed = metrics.get('Closed Sales', 0)
 
-    lead_to_qual_rate = (qualified / total * 100) if total > 0 else 0
-    qual_to_sched_rate = (viewings_scheduled / qualified * 100) if qualified > 0 else 0
-    sched_to_comp_rate = (viewings_completed / viewings_scheduled * 100) if viewings_scheduled > 0 else 0
-    comp_to_offer_rate = (offers / viewings_completed * 100) if viewings_completed > 0 else 0
-    offer_to_accept_rate = (offers_accepted / offers * 100) if offers > 0 else 0
-    accept_to_close_rate = (closed / offers_accepted * 100) if offers_accepted > 0 else 0
-    overall_close_rate = (closed / total * 100) if total > 0 else 0
+    # All seven stage ratios in one vectorized divide, 0 where the source stage is empty
+    (
+        lead_to_qual_rate, qual_to_sched_rate, sched_to_comp_rate, comp_to_offer_rate,
+        offer_to_accept_rate, accept_to_close_rate, overall_close_rate
+    ) = (conversion_rates(
+        [total, qualified, viewings_scheduled, viewings_completed, offers, offers_accepted, total],
+        [qualified, viewings_scheduled, viewings_completed, offers, offers_accepted, closed, closed]
+    ) * 100).tolist()
 
     # Sales Funnel Flow Chart
     st.markdown("### 📊 Sales Funnel Flow")
 
-    # Row 1: Total Leads → Qualified → Viewings Scheduled → Viewings Completed
-    st.markdown(f"""
-    <div class="flow-container">
-        <div class="flow-metric">
-            <div class="flow-metric-label">Total Leads</div>
-            <div class="flow-metric-value">{total}</div>
-        </div>
-        <div class="flow-arrow">
-            <div class="flow-arrow-icon">→</div>
-            <div class="flow-arrow-rate">{lead_to_qual_rate:.1f}%</div>
-        </div>
-        <div class="flow-metric">
-            <div class="flow-metric-label">Qualified</div>
-            <div class="flow-metric-value">{qualified}</div>
-        </div>
-        <div class="flow-arrow">
-            <div class="flow-arrow-icon">→</div>
-            <div class="flow-arrow-rate">{qual_to_sched_rate:.1f}%</div>
-        </div>
-        <div class="flow-metric">
-            <div class="flow-metric-label">Viewings Scheduled</div>
-            <div class="flow-metric-value">{viewings_scheduled}</div>
-        </div>
-        <div class="flow-arrow">
-            <div class="flow-arrow-icon">→</div>
-            <div class="flow-arrow-rate">{sched_to_comp_rate:.1f}%</div>
-        </div>
-        <div class="flow-metric">
-            <div class="flow-metric-label">Viewings Completed</div>
-            <div class="flow-metric-value">{viewings_completed}</div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-
-    # Row 2: Viewings Completed → Offers → Offers Accepted → Closed
-    st.markdown(f"""
-    <div class="flow-container">
-        <div class="flow-metric">
-            <div class="flow-metric-label">Viewings Completed</div>
-            <div class="flow-metric-value">{viewings_completed}</div>
-        </div>
-        <div class="flow-arrow">
-            <div class="flow-arrow-icon">→</div>
-            <div class="flow-arrow-rate">{comp_to_offer_rate:.1f}%</div>
-        </div>
-        <div class="flow-metric">
-            <div class="flow-metric-label">Offers</div>
-            <div class="flow-metric-value">{offers}</div>
-        </div>
-        <div class="flow-arrow">
-            <div class="flow-arrow-icon">→</div>
-            <div class="flow-arrow-rate">{offer_to_accept_rate:.1f}%</div>
-        </div>
-        <div class="flow-metric">
-            <div class="flow-metric-label">Offers Accepted</div>
-            <div class="flow-metric-value">{offers_accepted}</div>
-        </div>
-        <div class="flow-arrow">
-            <div class="flow-arrow-icon">→</div>
-            <div class="flow-arrow-rate">{accept_to_close_rate:.1f}%</div>
-        </div>
-        <div class="flow-metric">
-            <div class="flow-metric-label">Closed</div>
-            <div class="flow-metric-value">{closed}</div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-
-    # Overall Close Rate
-    st.markdown(f"""
-    <div style="text-align: center; margin: 2rem 0;">
-        <div style="display: inline-block; background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);
-                    padding: 1.5rem 3rem; border-radius: 15px; box-shadow: 0 4px 15px rgba(0,0,0,0.15);">
-            <div style="font-size: 1rem; color: rgba(255,255,255,0.95); margin-bottom: 0.5rem; text-transform: uppercase; letter-spacing: 0.5px;">Overall Close Rate</div>
-            <div style="font-size: 3rem; font-weight: bold; color: white;">{overall_close_rate:.1f}%</div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    # Both flow rows and the close-rate hero go out as one block
+    st.html(
+        # Row 1: Total Leads → Qualified → Viewings Scheduled → Viewings Completed
+        FLOW_ROW_TEMPLATE.format_map(dict(
+            label1="Total Leads", value1=total,
+            rate1=lead_to_qual_rate,
+            label2="Qualified", value2=qualified,
+            rate2=qual_to_sched_rate,
+            label3="Viewings Scheduled", value3=viewings_scheduled,
+            rate3=sched_to_comp_rate,
+            label4="Viewings Completed", value4=viewings_completed,
+        ))
+        # Row 2: Viewings Completed → Offers → Offers Accepted → Closed
+        + FLOW_ROW_TEMPLATE.format_map(dict(
+            label1="Viewings Completed", value1=viewings_completed,
+            rate1=comp_to_offer_rate,
+            label2="Offers", value2=offers,
+            rate2=offer_to_accept_rate,
+            label3="Offers Accepted", value3=offers_accepted,
+            rate3=accept_to_close_rate,
+            label4="Closed", value4=closed,
+        ))
+        + HERO_TEMPLATE.format(
+            label="Overall Close Rate", value=overall_close_rate,
+            background="linear-gradient(135deg, #43e97b 0%, #38f9d7 100%)"
+        )
+    )
 
     # Visual Funnel Chart
     if show_funnel:
@@ -640,28 +1551,12 @@ def main():
         col_funnel, col_progress = st.columns([3, 2])
 
         with col_funnel:
-            # Create Plotly funnel chart
-            fig = go.Figure(go.Funnel(
-                y=funnel_data['Stage'],
-                x=funnel_data['Count'],
-                textposition="inside",
-                textinfo="value+percent initial",
-                marker={
-                    "color": ["#667eea", "#764ba2", "#f093fb", "#4facfe", "#00f2fe", "#43e97b"],
-                    "line": {"width": 2, "color": "white"}
-                },
-                connector={"line": {"color": "#667eea", "dash": "dot", "width": 3}}
-            ))
-
-            fig.update_layout(
-                height=500,
-                margin=dict(l=20, r=20, t=20, b=20),
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(size=14, color='#333')
+            # Create Plotly funnel chart, rebuilt only when the counts change
+            fig = funnel_chart_json(
+                tuple(funnel_data['Stage']),
+                tuple(int(count) for count in funnel_data['Count'])
             )
-
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="lead_funnel")
 
         with col_progress:
             st.markdown("#### Stage Conversion Rates")
@@ -675,687 +1570,45 @@ def main():
                 ("Closed", metrics.get('Closed Sales', 0), total),
             ]
 
+            # All five bars as one HTML block instead of a label, progress widget and spacer each
+            progress_rows = []
             for stage_name, stage_count, total_count in stages_progress:
                 percentage = (stage_count / total_count * 100) if total_count > 0 else 0
-                st.markdown(f"**{stage_name}**: {stage_count} ({percentage:.1f}%)")
-                st.progress(percentage / 100)
-                st.markdown("")  # spacing
+                progress_rows.append(PROGRESS_ROW_TEMPLATE.format(
+                    name=stage_name, count=stage_count, pct=percentage, width=min(percentage, 100)
+                ))
+            st.html('<div class="progress-stack">' + ''.join(progress_rows) + '</div>')
 
     # WhatsApp Metrics
-    if whatsapp_df is not None and not whatsapp_df.empty:
-        st.markdown("---")
-        st.subheader("💬 WhatsApp Metrics")
-
-        # Get latest day's data
-        latest_whatsapp = whatsapp_df.iloc[-1]
-
-        # Calculate conversion rates
-        messages_answered = latest_whatsapp.get('Messages Answered', 0)
-        relevant = latest_whatsapp.get('Relevant', 0)
-        positive = latest_whatsapp.get('Positive', 0)
-        scheduled = latest_whatsapp.get('Scheduled Leads', 0)
-
-        # Conversion rates
-        answered_to_relevant = (relevant / messages_answered * 100) if messages_answered > 0 else 0
-        relevant_to_positive = (positive / relevant * 100) if relevant > 0 else 0
-        positive_to_scheduled = (scheduled / positive * 100) if positive > 0 else 0
-        overall_conversion = (scheduled / messages_answered * 100) if messages_answered > 0 else 0
-
-        # WhatsApp Flow Chart
-        st.markdown("### 📊 WhatsApp Conversion Flow")
-
-        st.markdown(f"""
-        <div class="flow-container">
-            <div class="flow-metric">
-                <div class="flow-metric-label">Messages Answered</div>
-                <div class="flow-metric-value">{int(messages_answered)}</div>
-            </div>
-            <div class="flow-arrow">
-                <div class="flow-arrow-icon">→</div>
-                <div class="flow-arrow-rate">{answered_to_relevant:.1f}%</div>
-            </div>
-            <div class="flow-metric">
-                <div class="flow-metric-label">Relevant</div>
-                <div class="flow-metric-value">{int(relevant)}</div>
-            </div>
-            <div class="flow-arrow">
-                <div class="flow-arrow-icon">→</div>
-                <div class="flow-arrow-rate">{relevant_to_positive:.1f}%</div>
-            </div>
-            <div class="flow-metric">
-                <div class="flow-metric-label">Positive</div>
-                <div class="flow-metric-value">{int(positive)}</div>
-            </div>
-            <div class="flow-arrow">
-                <div class="flow-arrow-icon">→</div>
-                <div class="flow-arrow-rate">{positive_to_scheduled:.1f}%</div>
-            </div>
-            <div class="flow-metric">
-                <div class="flow-metric-label">Scheduled Leads</div>
-                <div class="flow-metric-value">{int(scheduled)}</div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        # Overall Conversion Rate
-        st.markdown(f"""
-        <div style="text-align: center; margin: 2rem 0;">
-            <div style="display: inline-block; background: linear-gradient(135deg, #25D366 0%, #128C7E 100%);
-                        padding: 1.5rem 3rem; border-radius: 15px; box-shadow: 0 4px 15px rgba(0,0,0,0.15);">
-                <div style="font-size: 1rem; color: rgba(255,255,255,0.95); margin-bottom: 0.5rem; text-transform: uppercase; letter-spacing: 0.5px;">Overall Conversion Rate</div>
-                <div style="font-size: 3rem; font-weight: bold; color: white;">{overall_conversion:.1f}%</div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        # Summary cards in columns
-        st.markdown("---")
-        st.markdown("#### 📈 Daily Summary")
-
-        col1, col2, col3, col4, col5, col6 = st.columns(6)
-
-        with col1:
-            st.markdown("""
-            <div style="background: linear-gradient(135deg, #25D366 0%, #128C7E 100%);
-                        padding: 1.5rem; border-radius: 12px; text-align: center; box-shadow: 0 4px 15px rgba(0,0,0,0.15);">
-                <div style="font-size: 0.85rem; color: rgba(255,255,255,0.9); margin-bottom: 0.5rem; text-transform: uppercase;">
-                    Answered
-                </div>
-                <div style="font-size: 2rem; font-weight: bold; color: white;">
-                    {}
-                </div>
-            </div>
-            """.format(int(messages_answered)), unsafe_allow_html=True)
-
-        with col2:
-            st.markdown("""
-            <div style="background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);
-                        padding: 1.5rem; border-radius: 12px; text-align: center; box-shadow: 0 4px 15px rgba(0,0,0,0.15);">
-                <div style="font-size: 0.85rem; color: rgba(255,255,255,0.9); margin-bottom: 0.5rem; text-transform: uppercase;">
-                    Positive
-                </div>
-                <div style="font-size: 2rem; font-weight: bold; color: white;">
-                    {}
-                </div>
-            </div>
-            """.format(int(positive)), unsafe_allow_html=True)
-
-        with col3:
-            st.markdown("""
-            <div style="background: linear-gradient(135deg, #ff6b6b 0%, #ee5a6f 100%);
-                        padding: 1.5rem; border-radius: 12px; text-align: center; box-shadow: 0 4px 15px rgba(0,0,0,0.15);">
-                <div style="font-size: 0.85rem; color: rgba(255,255,255,0.9); margin-bottom: 0.5rem; text-transform: uppercase;">
-                    Negative
-                </div>
-                <div style="font-size: 2rem; font-weight: bold; color: white;">
-                    {}
-                </div>
-            </div>
-            """.format(int(latest_whatsapp.get('Negative', 0))), unsafe_allow_html=True)
-
-        with col4:
-            st.markdown("""
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        padding: 1.5rem; border-radius: 12px; text-align: center; box-shadow: 0 4px 15px rgba(0,0,0,0.15);">
-                <div style="font-size: 0.85rem; color: rgba(255,255,255,0.9); margin-bottom: 0.5rem; text-transform: uppercase;">
-                    Relevant
-                </div>
-                <div style="font-size: 2rem; font-weight: bold; color: white;">
-                    {}
-                </div>
-            </div>
-            """.format(int(relevant)), unsafe_allow_html=True)
-
-        with col5:
-            st.markdown("""
-            <div style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-                        padding: 1.5rem; border-radius: 12px; text-align: center; box-shadow: 0 4px 15px rgba(0,0,0,0.15);">
-                <div style="font-size: 0.85rem; color: rgba(255,255,255,0.9); margin-bottom: 0.5rem; text-transform: uppercase;">
-                    Irrelevant
-                </div>
-                <div style="font-size: 2rem; font-weight: bold; color: white;">
-                    {}
-                </div>
-            </div>
-            """.format(int(latest_whatsapp.get('Irrelevant', 0))), unsafe_allow_html=True)
-
-        with col6:
-            st.markdown("""
-            <div style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-                        padding: 1.5rem; border-radius: 12px; text-align: center; box-shadow: 0 4px 15px rgba(0,0,0,0.15);">
-                <div style="font-size: 0.85rem; color: rgba(255,255,255,0.9); margin-bottom: 0.5rem; text-transform: uppercase;">
-                    Scheduled
-                </div>
-                <div style="font-size: 2rem; font-weight: bold; color: white;">
-                    {}
-                </div>
-            </div>
-            """.format(int(scheduled)), unsafe_allow_html=True)
-
-        # Daily trends for WhatsApp
-        st.markdown("---")
-        st.markdown("#### 📊 WhatsApp Daily Trends")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # Messages Answered trend
-            fig = go.Figure()
-
-            fig.add_trace(go.Scatter(
-                x=whatsapp_df['Date'],
-                y=whatsapp_df.get('Messages Answered', [0] * len(whatsapp_df)),
-                mode='lines+markers',
-                name='Messages Answered',
-                line=dict(color='#25D366', width=3),
-                marker=dict(size=8),
-                fill='tozeroy',
-                fillcolor='rgba(37, 211, 102, 0.1)'
-            ))
-
-            fig.update_layout(
-                title="Messages Answered",
-                height=300,
-                margin=dict(l=20, r=20, t=40, b=20),
-                xaxis_title="Date",
-                yaxis_title="Messages",
-                hovermode='x unified',
-                showlegend=False
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            # Positive vs Negative
-            fig = go.Figure()
-
-            fig.add_trace(go.Bar(
-                x=whatsapp_df['Date'],
-                y=whatsapp_df.get('Positive', [0] * len(whatsapp_df)),
-                name='Positive',
-                marker=dict(color='#43e97b')
-            ))
-
-            fig.add_trace(go.Bar(
-                x=whatsapp_df['Date'],
-                y=whatsapp_df.get('Negative', [0] * len(whatsapp_df)),
-                name='Negative',
-                marker=dict(color='#ff6b6b')
-            ))
-
-            fig.update_layout(
-                title="Positive vs Negative",
-                height=300,
-                margin=dict(l=20, r=20, t=40, b=20),
-                xaxis_title="Date",
-                yaxis_title="Messages",
-                hovermode='x unified',
-                barmode='group'
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
-
-        # Relevant vs Irrelevant & Scheduled Leads
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # Relevant vs Irrelevant
-            fig = go.Figure()
-
-            fig.add_trace(go.Bar(
-                x=whatsapp_df['Date'],
-                y=whatsapp_df.get('Relevant', [0] * len(whatsapp_df)),
-                name='Relevant',
-                marker=dict(color='#667eea')
-            ))
-
-            fig.add_trace(go.Bar(
-                x=whatsapp_df['Date'],
-                y=whatsapp_df.get('Irrelevant', [0] * len(whatsapp_df)),
-                name='Irrelevant',
-                marker=dict(color='#f093fb')
-            ))
-
-            fig.update_layout(
-                title="Relevant vs Irrelevant",
-                height=300,
-                margin=dict(l=20, r=20, t=40, b=20),
-                xaxis_title="Date",
-                yaxis_title="Messages",
-                hovermode='x unified',
-                barmode='group'
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
-
-        with col2:
-            # Scheduled Leads
-            fig = go.Figure()
-
-            fig.add_trace(go.Scatter(
-                x=whatsapp_df['Date'],
-                y=whatsapp_df.get('Scheduled Leads', [0] * len(whatsapp_df)),
-                mode='lines+markers',
-                name='Scheduled Leads',
-                line=dict(color='#4facfe', width=3),
-                marker=dict(size=8),
-                fill='tozeroy',
-                fillcolor='rgba(79, 172, 254, 0.1)'
-            ))
-
-            fig.update_layout(
-                title="Scheduled Leads",
-                height=300,
-                margin=dict(l=20, r=20, t=40, b=20),
-                xaxis_title="Date",
-                yaxis_title="Leads",
-                hovermode='x unified',
-                showlegend=False
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
+    if show_whatsapp and has_whatsapp:
+        render_whatsapp(whatsapp_df)
 
     # Daily Trends
-    if show_trends and daily_df is not None and not daily_df.empty:
-        st.markdown("---")
-        st.subheader("📅 Daily Lead Trends")
-
-        # Date range filter
-        col1, col2, col3 = st.columns([2, 2, 3])
-
-        with col1:
-            min_date = daily_df['Date'].min().date()
-            max_date = daily_df['Date'].max().date()
-            start_date = st.date_input("From", value=min_date, min_value=min_date, max_value=max_date)
-
-        with col2:
-            end_date = st.date_input("To", value=max_date, min_value=min_date, max_value=max_date)
-
-        with col3:
-            st.markdown("##### Quick Filters")
-            col_a, col_b, col_c = st.columns(3)
-            with col_a:
-                if st.button("Last 7 Days"):
-                    start_date = max_date - pd.Timedelta(days=7)
-            with col_b:
-                if st.button("Last 30 Days"):
-                    start_date = max_date - pd.Timedelta(days=30)
-            with col_c:
-                if st.button("All Time"):
-                    start_date = min_date
-
-        # Filter data by date range
-        mask = (daily_df['Date'].dt.date >= start_date) & (daily_df['Date'].dt.date <= end_date)
-        filtered_daily = daily_df[mask]
-
-        if not filtered_daily.empty:
-            # Daily totals line chart
-            col1, col2 = st.columns(2)
-
-            with col1:
-                st.markdown("#### 📊 Daily Total Leads")
-
-                fig = go.Figure()
-
-                fig.add_trace(go.Scatter(
-                    x=filtered_daily['Date'],
-                    y=filtered_daily.get('Total Leads', [0] * len(filtered_daily)),
-                    mode='lines+markers',
-                    name='Total Leads',
-                    line=dict(color='#667eea', width=3),
-                    marker=dict(size=8),
-                    fill='tozeroy',
-                    fillcolor='rgba(102, 126, 234, 0.1)'
-                ))
-
-                fig.update_layout(
-                    height=350,
-                    margin=dict(l=20, r=20, t=20, b=20),
-                    xaxis_title="Date",
-                    yaxis_title="Leads",
-                    hovermode='x unified',
-                    showlegend=False
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
-
-                # Daily stats
-                total_period = filtered_daily.get('Total Leads', pd.Series([0])).sum()
-                avg_daily = filtered_daily.get('Total Leads', pd.Series([0])).mean()
-
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    st.metric("Total in Period", int(total_period))
-                with col_b:
-                    st.metric("Daily Average", f"{avg_daily:.1f}")
-
-            with col2:
-                st.markdown("#### 🎯 Daily Closed Sales")
-
-                fig = go.Figure()
-
-                fig.add_trace(go.Bar(
-                    x=filtered_daily['Date'],
-                    y=filtered_daily.get('Closed Sales', [0] * len(filtered_daily)),
-                    name='Closed Sales',
-                    marker=dict(
-                        color=filtered_daily.get('Closed Sales', [0] * len(filtered_daily)),
-                        colorscale='Greens',
-                        line=dict(color='white', width=1)
-                    )
-                ))
-
-                fig.update_layout(
-                    height=350,
-                    margin=dict(l=20, r=20, t=20, b=20),
-                    xaxis_title="Date",
-                    yaxis_title="Sales",
-                    hovermode='x unified',
-                    showlegend=False
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
-
-                # Sales stats
-                total_sales = filtered_daily.get('Closed Sales', pd.Series([0])).sum()
-                avg_sales = filtered_daily.get('Closed Sales', pd.Series([0])).mean()
-
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    st.metric("Total Sales", int(total_sales))
-                with col_b:
-                    st.metric("Daily Average", f"{avg_sales:.1f}")
-
-            # Budget Analysis (if budget column exists)
-            if 'Daily Budget' in filtered_daily.columns:
-                st.markdown("---")
-                st.markdown("#### 💰 Budget & Cost Analysis")
-
-                col1, col2, col3 = st.columns(3)
-
-                with col1:
-                    st.markdown("##### 📊 Daily Budget vs Leads")
-
-                    fig = go.Figure()
-
-                    # Budget bars
-                    fig.add_trace(go.Bar(
-                        x=filtered_daily['Date'],
-                        y=filtered_daily['Daily Budget'],
-                        name='Daily Budget',
-                        marker=dict(color='rgba(102, 126, 234, 0.6)'),
-                        yaxis='y'
-                    ))
-
-                    # Leads line
-                    fig.add_trace(go.Scatter(
-                        x=filtered_daily['Date'],
-                        y=filtered_daily.get('Total Leads', [0] * len(filtered_daily)),
-                        name='Total Leads',
-                        line=dict(color='#43e97b', width=3),
-                        marker=dict(size=8),
-                        yaxis='y2'
-                    ))
-
-                    fig.update_layout(
-                        height=300,
-                        margin=dict(l=20, r=20, t=20, b=20),
-                        xaxis_title="Date",
-                        yaxis=dict(title="Budget (£)", side='left'),
-                        yaxis2=dict(title="Leads", side='right', overlaying='y'),
-                        hovermode='x unified',
-                        showlegend=True,
-                        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-                    )
-
-                    st.plotly_chart(fig, use_container_width=True)
-
-                with col2:
-                    st.markdown("##### 💸 Cost Per Lead")
-
-                    # Calculate cost per lead
-                    filtered_daily['Cost Per Lead'] = filtered_daily.apply(
-                        lambda row: row['Daily Budget'] / row['Total Leads'] if row.get('Total Leads', 0) > 0 else 0,
-                        axis=1
-                    )
-
-                    fig = go.Figure()
-
-                    fig.add_trace(go.Scatter(
-                        x=filtered_daily['Date'],
-                        y=filtered_daily['Cost Per Lead'],
-                        mode='lines+markers',
-                        name='Cost Per Lead',
-                        line=dict(color='#f093fb', width=3),
-                        marker=dict(size=8),
-                        fill='tozeroy',
-                        fillcolor='rgba(240, 147, 251, 0.1)'
-                    ))
-
-                    fig.update_layout(
-                        height=300,
-                        margin=dict(l=20, r=20, t=20, b=20),
-                        xaxis_title="Date",
-                        yaxis_title="Cost (£)",
-                        hovermode='x unified',
-                        showlegend=False
-                    )
-
-                    st.plotly_chart(fig, use_container_width=True)
-
-                    # Average cost per lead
-                    avg_cost = filtered_daily['Cost Per Lead'].mean()
-                    st.metric("Avg Cost Per Lead", f"£{avg_cost:.2f}")
-
-                with col3:
-                    st.markdown("##### 📈 Budget Efficiency")
-
-                    # Calculate efficiency metrics
-                    total_budget = filtered_daily['Daily Budget'].sum()
-                    total_leads_period = filtered_daily.get('Total Leads', pd.Series([0])).sum()
-                    total_sales_period = filtered_daily.get('Closed Sales', pd.Series([0])).sum()
-
-                    overall_cost_per_lead = total_budget / total_leads_period if total_leads_period > 0 else 0
-                    cost_per_sale = total_budget / total_sales_period if total_sales_period > 0 else 0
-
-                    st.metric("Total Budget", f"£{total_budget:,.0f}")
-                    st.metric("Cost Per Lead", f"£{overall_cost_per_lead:.2f}")
-                    st.metric("Cost Per Sale", f"£{cost_per_sale:.2f}")
-
-                    # Efficiency score
-                    if overall_cost_per_lead > 0:
-                        efficiency = (1 / overall_cost_per_lead) * 100
-                        st.metric("Efficiency Score", f"{efficiency:.1f}")
-
-            # Multi-line funnel progression
-            st.markdown("---")
-            st.markdown("#### 📈 Funnel Progression Over Time")
-
-            fig = go.Figure()
-
-            metrics_to_plot = [
-                ('Total Leads', '#667eea'),
-                ('Qualified Leads', '#764ba2'),
-                ('Viewings Completed', '#f093fb'),
-                ('Offers Made', '#4facfe'),
-                ('Closed Sales', '#43e97b')
-            ]
-
-            for metric_name, color in metrics_to_plot:
-                if metric_name in filtered_daily.columns:
-                    fig.add_trace(go.Scatter(
-                        x=filtered_daily['Date'],
-                        y=filtered_daily[metric_name],
-                        mode='lines+markers',
-                        name=metric_name,
-                        line=dict(color=color, width=2),
-                        marker=dict(size=6)
-                    ))
-
-            fig.update_layout(
-                height=400,
-                margin=dict(l=20, r=20, t=20, b=60),
-                xaxis_title="Date",
-                yaxis_title="Count",
-                hovermode='x unified',
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=-0.3,
-                    xanchor="center",
-                    x=0.5
-                )
-            )
-
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.warning("No data available for selected date range")
-
+    if show_trends and has_daily:
+        render_daily_trends(daily_df)
     elif show_trends:
         st.info("💡 **Add Daily Tracking:** Create a 'Daily' worksheet in your Google Sheets to see trends over time!")
 
     # Bottleneck Analysis
     if show_bottleneck and total > 0:
-        st.markdown("---")
-        st.subheader("🔴 Bottleneck Analysis")
-
-        bottlenecks = calculate_bottleneck(metrics)
-
-        if bottlenecks:
-            # Highlight the biggest bottleneck
-            worst = bottlenecks[0]
-
-            col1, col2 = st.columns([2, 3])
-
-            with col1:
-                st.error(f"### 🚨 Critical Bottleneck")
-                st.markdown(f"""
-                **{worst['stage']}**
-                - Conversion Rate: **{worst['rate']:.1f}%**
-                - Drop-off: **{worst['drop_off']}** leads
-                - From: {worst['from']} → To: {worst['to']}
-                """)
-
-                # Recommendation
-                if worst['rate'] < 50:
-                    st.warning("⚠️ **Action Needed:** Focus improvement efforts here for maximum impact!")
-
-            with col2:
-                st.markdown("#### All Conversion Stages")
-
-                # Create bar chart for all stages
-                bottleneck_df = pd.DataFrame(bottlenecks)
-
-                fig = px.bar(
-                    bottleneck_df,
-                    x='rate',
-                    y='stage',
-                    orientation='h',
-                    color='rate',
-                    color_continuous_scale=['#ff4444', '#ffaa00', '#44ff44'],
-                    labels={'rate': 'Conversion Rate (%)', 'stage': 'Stage'},
-                    text='rate'
-                )
-
-                fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-                fig.update_layout(
-                    height=300,
-                    showlegend=False,
-                    margin=dict(l=20, r=20, t=20, b=20)
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+        render_bottleneck_analysis(metrics)
 
     # Projections & Forecasting
     if show_projections and total > 0:
-        st.markdown("---")
-        st.subheader("🔮 Projections & Forecasting")
-
-        projections = calculate_projections(metrics)
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("#### 📊 Next 100 Leads Projection")
-            st.markdown("*Based on current conversion rates*")
-
-            st.metric("Expected Qualified", projections['projected_qualified'])
-            st.metric("Expected Viewings", projections['projected_viewings'])
-            st.metric("Expected Offers", projections['projected_offers'])
-            st.metric("Expected Closed Sales", projections['projected_closed'],
-                     delta=f"{projections['current_close_rate']:.1f}% close rate")
-
-        with col2:
-            st.markdown("#### 🎯 What-If Scenarios")
-            st.markdown("*Impact of 10% improvement*")
-
-            current_closed = projections['projected_closed']
-
-            st.info(f"**If Qualification improves by 10%:**")
-            st.write(f"Closed Sales: {projections['if_qual_improves_10']} (+{projections['if_qual_improves_10'] - current_closed})")
-
-            st.info(f"**If Viewing Conversion improves by 10%:**")
-            st.write(f"Closed Sales: {projections['if_viewing_improves_10']} (+{projections['if_viewing_improves_10'] - current_closed})")
-
-            st.success("💡 **Tip:** Focus on the bottleneck stage for maximum ROI")
+        render_projections(metrics)
 
     # Pipeline Health & Performance Targets
     if (show_pipeline or show_targets) and total > 0:
-        st.markdown("---")
-        col1, col2 = st.columns(2)
-
-        if show_pipeline:
-            with col1:
-                st.markdown("#### 📊 Pipeline Health")
-                pipeline_stages = [
-                    ("In Viewings", metrics.get('Viewings Scheduled', 0) + metrics.get('Viewings Completed', 0)),
-                    ("In Negotiation", metrics.get('Offers Made', 0) + metrics.get('Offers Accepted', 0)),
-                    ("Ready to Close", metrics.get('Offers Accepted', 0))
-                ]
-
-                for stage, count in pipeline_stages:
-                    st.metric(stage, count)
-
-        if show_targets:
-            with col2:
-                st.markdown("#### 🎯 Performance Targets")
-
-                # Calculate rates
-                qualified_rate = (metrics.get('Qualified Leads', 0) / total * 100) if total > 0 else 0
-                viewing_to_offer = (metrics.get('Offers Made', 0) / metrics.get('Viewings Completed', 1) * 100) if metrics.get('Viewings Completed', 0) > 0 else 0
-                close_rate = (metrics.get('Closed Sales', 0) / total * 100) if total > 0 else 0
-
-                # Calculate if targets are being met (example thresholds)
-                targets = {
-                    "Qualification Rate": (qualified_rate, 30, "%"),
-                    "Close Rate": (close_rate, 5, "%"),
-                    "Viewing Conversion": (viewing_to_offer, 40, "%")
-                }
-
-                for metric_name, (value, target, unit) in targets.items():
-                    if value >= target:
-                        st.success(f"✅ {metric_name}: {value:.1f}{unit} (Target: {target}{unit})")
-                    else:
-                        st.error(f"❌ {metric_name}: {value:.1f}{unit} (Target: {target}{unit})")
+        render_pipeline_and_targets(metrics, show_pipeline, show_targets)
 
     # Last updated timestamp
     if last_update:
-        st.markdown(f"""
-        <div class="last-update">
-            🕐 Last updated: {last_update.strftime('%B %d, %Y at %H:%M:%S')}
-            <br>
-            <small>Use 🔄 button or Rerun from menu to refresh</small>
-        </div>
-        """, unsafe_allow_html=True)
+        st.html(
+            LAST_UPDATE_TEMPLATE.format(ts=last_update.strftime('%B %d, %Y at %H:%M:%S'))
+        )
 
     # Footer
-    st.markdown("""
-    <div class="footer">
-        🔒 GDPR Compliant Dashboard • No Personal Data Stored or Displayed
-        <br>
-        Joseph Mews © 2024 • All Rights Reserved
-    </div>
-    """, unsafe_allow_html=True)
+    st.html(FOOTER_HTML)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,28 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import os
+import json
+import hashlib
 from datetime import datetime, timedelta
+from sheet_utils import parse_sheet_dates, private_cache_dir, write_private_file
+
+# Stages that count as qualified, and the won stage; shared by every page's aggregates
+QUALIFIED_STAGES = pd.Index(['Qualified Lead', 'Discovery/Presentation', 'Opportunity',
+                             'Negotiation', 'Contract Signed'])
+WON_STAGE = 'Contract Signed'
+
+# Lead Tracker columns the dashboards read; anything else in the sheet is dropped at load
+USED_COLUMNS = (
+    'Lead ID', 'First Name', 'Last Name', 'Phone', 'Email', 'Budget Range', 'Notes',
+    'Lead Source', 'Current Stage', 'Agent Assigned', 'Campaign Name',
+    'Date Collected', 'Last Contact Date', 'Next Follow-up'
+)
+
+# Pie charts show at most this many slices; the long tail is folded into "Other"
+PIE_MAX_SLICES = 10
+
+# The agent leaderboard lists the top agents by deals won
+LEADERBOARD_MAX_AGENTS = 20
 
 # Page config
 st.set_page_config(
@@ -38,19 +58,24 @@ st.markdown("""
 try:
     import gspread
     from google.oauth2.service_account import Credentials
+    from google.auth.exceptions import GoogleAuthError
+    from requests.exceptions import RequestException
     GOOGLE_SHEETS_AVAILABLE = True
 except ImportError:
     GOOGLE_SHEETS_AVAILABLE = False
 
+# OAuth scopes for the service account: read the sheet and its Drive metadata
+SHEETS_SCOPES = (
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+)
+
 @st.cache_resource
 def get_google_sheets_client():
     """Initialize Google Sheets client with credentials"""
     if not GOOGLE_SHEETS_AVAILABLE:
         return None
 
-    import os
-    import json
-
     credentials_dict = None
 
     try:
@@ -93,10 +118,7 @@ def get_google_sheets_client():
 
         credentials = Credentials.from_service_account_info(
             credentials_dict,
-            scopes=[
-                "https://www.googleapis.com/auth/spreadsheets",
-                "https://www.googleapis.com/auth/drive"
-            ]
+            scopes=SHEETS_SCOPES
         )
         client = gspread.authorize(credentials)
         return client
@@ -104,26 +126,122 @@ def get_google_sheets_client():
         st.error(f"Error connecting to Google Sheets: {e}")
         return None
 
+# Bump when prepare_leads adds or changes columns so older on-disk copies are ignored
+LEADS_CACHE_VERSION = 3
+
+def leads_cache_path(spreadsheet_url):
+    """On-disk Arrow cache file for one spreadsheet, None when no private cache directory is usable"""
+    directory = private_cache_dir()
+    if directory is None:
+        return None
+    digest = hashlib.sha256(spreadsheet_url.encode()).hexdigest()[:16]
+    return os.path.join(directory, f"leads_{digest}.arrow")
+
+def sheet_modified_time(sheet):
+    """Drive last-modified time of the spreadsheet, None if it cannot be read"""
+    try:
+        if hasattr(sheet, "get_lastUpdateTime"):
+            return sheet.get_lastUpdateTime()
+        return sheet.lastUpdateTime
+    except (gspread.exceptions.GSpreadException, GoogleAuthError, RequestException, AttributeError):
+        # Drive metadata is optional; without it the sheet is simply fetched in full
+        return None
+
+def load_cached_leads(path, modified):
+    """Read the cached lead frame if it was saved for this sheet revision"""
+    try:
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        if meta.get("modified") != modified or meta.get("version") != LEADS_CACHE_VERSION:
+            return None
+        return pd.read_feather(path)
+    except (OSError, ValueError, TypeError):
+        return None
+
+def store_cached_leads(path, modified, df):
+    """Persist the prepared lead frame as Arrow IPC, readable by the owner only"""
+    # Unformatted cells mix numbers and text in one column, which Arrow cannot store as object
+    mixed = df.select_dtypes(include='object').columns
+    if len(mixed):
+        df = df.astype({col: 'string' for col in mixed})
+
+    # The sidecar is replaced last, so a reader never pairs it with a half-written frame
+    meta = json.dumps({"modified": modified, "version": LEADS_CACHE_VERSION}).encode()
+    directory = os.path.dirname(path)
+    try:
+        write_private_file(directory, path, df.to_feather)
+        write_private_file(directory, path + ".json", lambda f: f.write(meta))
+    except (OSError, ValueError, TypeError):
+        # Disk caching is best effort; an unwritable cache dir just means a fresh fetch next time
+        pass
+
 @st.cache_data(ttl=300)
 def load_data_from_sheets(_client, spreadsheet_url):
     """Load data from Google Sheets"""
     try:
         sheet = _client.open_by_url(spreadsheet_url)
-        worksheet = sheet.worksheet("Lead Tracker")
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
         
-        # Convert date columns
-        date_columns = ['Date Collected', 'Last Contact Date', 'Next Follow-up']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
+        # After a restart or TTL expiry, an unchanged sheet is read back from the local Arrow copy
+        cache_path = leads_cache_path(spreadsheet_url)
+        modified = sheet_modified_time(sheet)
+        cached = load_cached_leads(cache_path, modified) if modified and cache_path else None
+        if cached is not None:
+            return cached
+        
+        worksheet = sheet.worksheet("Lead Tracker")
+        # One 2-D list of raw cell values instead of a dict per row; dates still come back as text
+        values = worksheet.get_all_values(
+            value_render_option='UNFORMATTED_VALUE',
+            date_time_render_option='FORMATTED_STRING'
+        )
+        if not values:
+            return pd.DataFrame()
+        header, rows = values[0], values[1:]
+        width = len(header)
+        df = pd.DataFrame([row[:width] for row in rows], columns=header)
         
+        # Project to the used columns before any parsing so later scans and the disk cache skip the rest
+        df = prepare_leads(df[[col for col in USED_COLUMNS if col in df.columns]])
+        if modified and cache_path:
+            store_cached_leads(cache_path, modified, df)
         return df
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
+def prepare_leads(df):
+    """Parse dates, categorise the repeated label columns and flag qualified/won rows once per load"""
+    # Convert date columns
+    date_columns = ['Date Collected', 'Last Contact Date', 'Next Follow-up']
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = parse_sheet_dates(df[col])
+    
+    # Follow-up day at midnight, so "due today" is a datetime64 compare rather than a .dt.date object array
+    if 'Next Follow-up' in df.columns:
+        df['_followup_date'] = df['Next Follow-up'].dt.normalize()
+    
+    # Stage, source, agent and campaign repeat a handful of labels, so comparisons run on integer codes
+    for col in ('Current Stage', 'Lead Source', 'Agent Assigned', 'Campaign Name'):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    if 'Current Stage' in df.columns:
+        df['_is_qualified'] = df['Current Stage'].isin(QUALIFIED_STAGES)
+        df['_is_won'] = df['Current Stage'] == WON_STAGE
+    
+    return df
+
+def top_counts(counts, label, value_name):
+    """value_counts result as a two-column frame, capped at PIE_MAX_SLICES with the rest summed as Other"""
+    if len(counts) > PIE_MAX_SLICES:
+        top = counts.iloc[:PIE_MAX_SLICES - 1]
+        counts = pd.Series(
+            [*top.to_numpy(), counts.iloc[PIE_MAX_SLICES - 1:].sum()],
+            index=[*top.index.astype(str), 'Other']
+        )
+    return pd.DataFrame({label: counts.index.astype(str), value_name: counts.to_numpy()})
+
 def get_funnel_metrics(df):
     """Calculate funnel metrics"""
     stages = [
@@ -137,12 +255,12 @@ def get_funnel_metrics(df):
         'Contract Signed'
     ]
     
-    metrics = []
-    for stage in stages:
-        count = len(df[df['Current Stage'] == stage]) if len(df) > 0 else 0
-        metrics.append({'Stage': stage, 'Count': count})
-    
-    return pd.DataFrame(metrics)
+    # Count every stage in one pass instead of filtering a frame copy per stage
+    counts = df['Current Stage'].value_counts() if len(df) > 0 else pd.Series(dtype='int64')
+    return pd.DataFrame({
+        'Stage': stages,
+        'Count': [int(counts.get(stage, 0)) for stage in stages]
+    })
 
 def get_summary_stats(df):
     """Get summary statistics"""
@@ -157,11 +275,11 @@ def get_summary_stats(df):
         }
     
     total_leads = len(df)
-    qualified_stages = ['Qualified Lead', 'Discovery/Presentation', 'Opportunity', 
-                       'Negotiation', 'Contract Signed']
-    qualified = len(df[df['Current Stage'].isin(qualified_stages)])
-    won = len(df[df['Current Stage'] == 'Contract Signed'])
-    lost = len(df[df['Current Stage'] == 'Lost'])
+    # One pass over the stage column, then plain lookups
+    counts = df['Current Stage'].value_counts()
+    qualified = int(sum(counts.get(stage, 0) for stage in QUALIFIED_STAGES))
+    won = int(counts.get(WON_STAGE, 0))
+    lost = int(counts.get('Lost', 0))
     
     win_rate = (won / total_leads * 100) if total_leads > 0 else 0
     
@@ -174,29 +292,25 @@ def get_summary_stats(df):
         'active': total_leads - won - lost
     }
 
+def performance_by(df, key):
+    """Lead totals, qualified and won counts and rates per value of `key`"""
+    # One groupby over the stage flags set at load instead of re-filtering the frame per group
+    perf = df.groupby(key, observed=True).agg(
+        Total=('Lead ID', 'count'),
+        Qualified=('_is_qualified', 'sum'),
+        Won=('_is_won', 'sum')
+    ).reset_index()
+    
+    perf['Qual Rate'] = (perf['Qualified'] / perf['Total'] * 100).round(1)
+    perf['Win Rate'] = (perf['Won'] / perf['Total'] * 100).round(1)
+    return perf
+
 def get_source_performance(df):
     """Get performance by lead source"""
     if len(df) == 0:
         return pd.DataFrame()
     
-    sources = df.groupby('Lead Source').agg({
-        'Lead ID': 'count',
-    }).rename(columns={'Lead ID': 'Total'}).reset_index()
-    
-    qualified_stages = ['Qualified Lead', 'Discovery/Presentation', 'Opportunity', 
-                       'Negotiation', 'Contract Signed']
-    
-    for idx, row in sources.iterrows():
-        source_df = df[df['Lead Source'] == row['Lead Source']]
-        qualified = len(source_df[source_df['Current Stage'].isin(qualified_stages)])
-        won = len(source_df[source_df['Current Stage'] == 'Contract Signed'])
-        
-        sources.at[idx, 'Qualified'] = int(qualified)
-        sources.at[idx, 'Won'] = int(won)
-        sources.at[idx, 'Qual Rate'] = round((qualified / row['Total'] * 100), 1) if row['Total'] > 0 else 0
-        sources.at[idx, 'Win Rate'] = round((won / row['Total'] * 100), 1) if row['Total'] > 0 else 0
-    
-    return sources
+    return performance_by(df, 'Lead Source')
 
 def get_agent_performance(df):
     """Get performance by agent"""
@@ -208,24 +322,8 @@ def get_agent_performance(df):
     if len(agent_df) == 0:
         return pd.DataFrame()
     
-    agents = agent_df.groupby('Agent Assigned').agg({
-        'Lead ID': 'count',
-    }).rename(columns={'Lead ID': 'Total'}).reset_index()
-    
-    qualified_stages = ['Qualified Lead', 'Discovery/Presentation', 'Opportunity', 
-                       'Negotiation', 'Contract Signed']
-    
-    for idx, row in agents.iterrows():
-        agent_leads = agent_df[agent_df['Agent Assigned'] == row['Agent Assigned']]
-        qualified = len(agent_leads[agent_leads['Current Stage'].isin(qualified_stages)])
-        won = len(agent_leads[agent_leads['Current Stage'] == 'Contract Signed'])
-        
-        agents.at[idx, 'Qualified'] = int(qualified)
-        agents.at[idx, 'Won'] = int(won)
-        agents.at[idx, 'Qual Rate'] = round((qualified / row['Total'] * 100), 1) if row['Total'] > 0 else 0
-        agents.at[idx, 'Win Rate'] = round((won / row['Total'] * 100), 1) if row['Total'] > 0 else 0
-    
-    return agents.sort_values('Won', ascending=False)
+    agents = performance_by(agent_df, 'Agent Assigned')
+    return agents.nlargest(LEADERBOARD_MAX_AGENTS, 'Won').reset_index(drop=True)
 
 def main():
     # Sidebar navigation
@@ -293,6 +391,9 @@ def main():
 
 def show_admin_dashboard(df):
     """Admin dashboard with full analytics"""
+    # Plotly is only imported by the pages that draw charts
+    import plotly.express as px
+    
     st.markdown('<h1 class="main-header">🎯 Admin Dashboard</h1>', unsafe_allow_html=True)
     st.markdown("Complete funnel overview and analytics")
     
@@ -332,8 +433,7 @@ def show_admin_dashboard(df):
     with col2:
         st.subheader("📈 Stage Distribution")
         if len(df) > 0:
-            stage_data = df['Current Stage'].value_counts().reset_index()
-            stage_data.columns = ['Stage', 'Count']
+            stage_data = top_counts(df['Current Stage'].value_counts(), 'Stage', 'Count')
             fig = px.pie(stage_data, values='Count', names='Stage',
                         color_discrete_sequence=px.colors.sequential.Purples_r)
             fig.update_layout(height=400)
@@ -366,7 +466,8 @@ def show_admin_dashboard(df):
     st.markdown("---")
     st.subheader("📋 Recent Leads")
     if len(df) > 0:
-        recent_leads = df.sort_values('Date Collected', ascending=False).head(10)
+        # Partial selection of the ten newest rows rather than sorting the whole frame
+        recent_leads = df.nlargest(10, 'Date Collected')
         display_cols = ['Lead ID', 'First Name', 'Last Name', 'Current Stage', 
                        'Agent Assigned', 'Date Collected']
         display_cols = [col for col in display_cols if col in df.columns]
@@ -376,6 +477,9 @@ def show_admin_dashboard(df):
 
 def show_client_dashboard(df):
     """Client dashboard for Joseph Mews"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
     st.markdown('<h1 class="main-header">🏘️ Joseph Mews Campaign Dashboard</h1>', unsafe_allow_html=True)
     st.markdown("Birmingham Property Campaign Performance")
     
@@ -426,8 +530,7 @@ def show_client_dashboard(df):
     with col2:
         st.subheader("📈 Source Breakdown")
         if len(df) > 0:
-            source_data = df['Lead Source'].value_counts().reset_index()
-            source_data.columns = ['Source', 'Leads']
+            source_data = top_counts(df['Lead Source'].value_counts(), 'Source', 'Leads')
             
             fig = px.pie(source_data, values='Leads', names='Source',
                         hole=0.4,
@@ -442,24 +545,18 @@ def show_client_dashboard(df):
     # Top campaigns
     st.subheader("🚀 Top Performing Campaigns")
     if len(df) > 0 and 'Campaign Name' in df.columns:
-        campaign_data = df.groupby('Campaign Name').agg({
-            'Lead ID': 'count'
-        }).rename(columns={'Lead ID': 'Leads'}).reset_index()
-        campaign_data = campaign_data.sort_values('Leads', ascending=False).head(5)
+        # Leads, qualified and won per campaign from one groupby, then the five largest
+        campaign_data = performance_by(df, 'Campaign Name').nlargest(5, 'Total')
         
-        for idx, row in campaign_data.iterrows():
-            campaign_leads = df[df['Campaign Name'] == row['Campaign Name']]
-            qualified = len(campaign_leads[campaign_leads['Current Stage'].isin(
-                ['Qualified Lead', 'Discovery/Presentation', 'Opportunity', 'Negotiation', 'Contract Signed']
-            )])
-            won = len(campaign_leads[campaign_leads['Current Stage'] == 'Contract Signed'])
-            
+        for campaign, leads, qualified, won in campaign_data[
+            ['Campaign Name', 'Total', 'Qualified', 'Won']
+        ].itertuples(index=False, name=None):
             with st.container():
                 st.markdown(f"""
-                **{row['Campaign Name']}**  
-                {row['Leads']} leads · {qualified} qualified · {won} won · {qualified/row['Leads']*100:.0f}% qual rate
+                **{campaign}**  
+                {leads} leads · {qualified} qualified · {won} won · {qualified/leads*100:.0f}% qual rate
                 """)
-                st.progress(qualified / row['Leads'] if row['Leads'] > 0 else 0)
+                st.progress(qualified / leads if leads > 0 else 0)
                 st.markdown("---")
     else:
         st.info("No campaign data available")
@@ -470,7 +567,8 @@ def show_agent_dashboard(df):
     
     # Agent selector
     if len(df) > 0 and 'Agent Assigned' in df.columns:
-        agents = df[df['Agent Assigned'].notna() & (df['Agent Assigned'] != 'Unassigned')]['Agent Assigned'].unique()
+        # Categories are the distinct agents seen at load, no scan over the rows
+        agents = df['Agent Assigned'].cat.categories.difference(['Unassigned'])
     else:
         agents = []
     
@@ -478,17 +576,20 @@ def show_agent_dashboard(df):
         st.warning("No agents found with assigned leads.")
         return
     
-    selected_agent = st.selectbox("Select Your Name:", sorted(agents))
+    show_agent_leads(df, sorted(agents))
+
+@st.fragment
+def show_agent_leads(df, agents):
+    """Selected agent's stats, follow-ups and leads; the agent and stage pickers rerun only this part"""
+    selected_agent = st.selectbox("Select Your Name:", agents)
     
     # Filter for selected agent
     agent_leads = df[df['Agent Assigned'] == selected_agent]
     
     # Stats
     total = len(agent_leads)
-    qualified = len(agent_leads[agent_leads['Current Stage'].isin(
-        ['Qualified Lead', 'Discovery/Presentation', 'Opportunity', 'Negotiation', 'Contract Signed']
-    )])
-    won = len(agent_leads[agent_leads['Current Stage'] == 'Contract Signed'])
+    qualified = int(agent_leads['_is_qualified'].sum())
+    won = int(agent_leads['_is_won'].sum())
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -504,9 +605,9 @@ def show_agent_dashboard(df):
     st.markdown("---")
     
     # Today's follow-ups
-    today = datetime.now().date()
-    if 'Next Follow-up' in agent_leads.columns:
-        urgent_leads = agent_leads[agent_leads['Next Follow-up'].dt.date == today]
+    today = pd.Timestamp(datetime.now().date())
+    if '_followup_date' in agent_leads.columns:
+        urgent_leads = agent_leads[agent_leads['_followup_date'] == today]
     else:
         urgent_leads = pd.DataFrame()
     
@@ -536,7 +637,7 @@ def show_agent_dashboard(df):
     st.subheader("📋 All My Leads")
     
     # Stage filter
-    stages = ['All'] + sorted(agent_leads['Current Stage'].unique().tolist())
+    stages = ['All'] + sorted(agent_leads['Current Stage'].cat.remove_unused_categories().cat.categories)
     stage_filter = st.selectbox("Filter by Stage:", stages)
     
     if stage_filter != 'All':
@@ -544,24 +645,15 @@ def show_agent_dashboard(df):
     else:
         filtered_leads = agent_leads
     
-    # Display leads
+    # Display leads as one table instead of an expander per lead
     if len(filtered_leads) > 0:
-        for idx, lead in filtered_leads.iterrows():
-            with st.expander(f"{lead.get('First Name', 'N/A')} {lead.get('Last Name', 'N/A')} - {lead.get('Current Stage', 'N/A')}"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Lead ID:** {lead.get('Lead ID', 'N/A')}")
-                    st.write(f"**📞 Phone:** {lead.get('Phone', 'N/A')}")
-                    st.write(f"**📧 Email:** {lead.get('Email', 'N/A')}")
-                with col2:
-                    st.write(f"**💰 Budget:** {lead.get('Budget Range', 'N/A')}")
-                    follow_up = lead.get('Next Follow-up')
-                    follow_up_str = follow_up.strftime('%d/%m/%Y') if pd.notna(follow_up) else 'Not set'
-                    st.write(f"**📅 Next Follow-up:** {follow_up_str}")
-                    st.write(f"**🎯 Lead Source:** {lead.get('Lead Source', 'N/A')}")
-                
-                notes = lead.get('Notes', 'No notes')
-                st.write(f"**📝 Notes:** {notes if pd.notna(notes) else 'No notes'}")
+        display_cols = ['Lead ID', 'First Name', 'Last Name', 'Phone', 'Email', 'Budget Range',
+                       'Next Follow-up', 'Lead Source', 'Current Stage', 'Notes']
+        display_cols = [col for col in display_cols if col in filtered_leads.columns]
+        view = filtered_leads[display_cols].copy()
+        if 'Next Follow-up' in view.columns:
+            view['Next Follow-up'] = view['Next Follow-up'].dt.strftime('%d/%m/%Y').fillna('Not set')
+        st.dataframe(view, use_container_width=True, hide_index=True)
     else:
         st.info("No leads match the selected filter")
 
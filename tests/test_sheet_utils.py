@@ -0,0 +1,27 @@
+import os
+
+import pandas as pd
+
+import sheet_utils
+
+
+def test_parse_sheet_dates_picks_day_first_layout():
+    parsed = sheet_utils.parse_sheet_dates(pd.Series(['', '25/01/2026', '03/02/2026', 'not a date']))
+    assert parsed.dt.strftime('%Y-%m-%d').tolist()[1:3] == ['2026-01-25', '2026-02-03']
+    assert parsed.isna().tolist() == [True, False, False, True]
+
+
+def test_private_cache_dir_refuses_symlink(tmp_path, monkeypatch):
+    target = tmp_path / "elsewhere"
+    target.mkdir(mode=0o700)
+    os.symlink(target, tmp_path / "cache")
+    monkeypatch.setattr(sheet_utils, "CACHE_DIR", str(tmp_path / "cache"))
+    assert sheet_utils.private_cache_dir() is None
+
+
+def test_write_private_file_is_owner_only(tmp_path):
+    path = tmp_path / "out.bin"
+    sheet_utils.write_private_file(str(tmp_path), str(path), lambda f: f.write(b"x"))
+    assert path.read_bytes() == b"x"
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert os.listdir(tmp_path) == ["out.bin"]
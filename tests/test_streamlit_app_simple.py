@@ -0,0 +1,84 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import sheet_utils
+import streamlit_app_simple as app
+
+
+@pytest.fixture
+def token_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(sheet_utils, "CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(app, "TOKEN_CACHE_PATH", str(cache_dir / "sa_token.json"))
+    return cache_dir / "sa_token.json"
+
+
+def credentials(token=None, expiry=None):
+    return SimpleNamespace(service_account_email="sa@example.iam.gserviceaccount.com", token=token, expiry=expiry)
+
+
+@pytest.mark.parametrize("content", ["[]", "\"token\"", "{\"client_email\": \"sa@example.iam.gserviceaccount.com\"}", "not json"])
+def test_bad_token_file_is_a_cache_miss(token_cache, content):
+    token_cache.parent.mkdir(mode=0o700)
+    token_cache.write_text(content)
+    creds = credentials()
+    assert app.load_cached_token(creds) is False
+    assert creds.token is None
+
+
+def test_token_round_trip(token_cache):
+    expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+    app.store_token(credentials("abc", expiry))
+
+    assert token_cache.stat().st_mode & 0o777 == 0o600
+    assert json.loads(token_cache.read_text())["token"] == "abc"
+    assert os.listdir(token_cache.parent) == ["sa_token.json"]
+
+    creds = credentials()
+    assert app.load_cached_token(creds) is True
+    assert (creds.token, creds.expiry) == ("abc", expiry)
+
+
+def test_shared_cache_dir_is_refused(token_cache):
+    token_cache.parent.mkdir()
+    token_cache.parent.chmod(0o777)
+    expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+    app.store_token(credentials("abc", expiry))
+    assert not token_cache.exists()
+
+
+def test_values_to_frame_pads_short_rows():
+    frame = app.values_to_frame([["Date", "Leads", "Notes"], ["2026-01-01", "3"], ["2026-01-02"], ["2026-01-03", "1", "x", "extra"]])
+    assert frame.shape == (3, 3)
+    assert frame["Leads"].tolist() == ["3", "", "1"]
+    assert frame["Notes"].tolist() == ["", "", "x"]
+
+
+def test_prepare_dated_frame_reads_day_first_dates():
+    frame = app.values_to_frame([["Date", "Total Leads"], ["25/01/2026", "4"], ["03/01/2026", "2"]])
+    frame = app.prepare_dated_frame(frame, ["Total Leads"])
+    assert frame["Date"].dt.strftime("%Y-%m-%d").tolist() == ["2026-01-03", "2026-01-25"]
+    assert frame["Total Leads"].tolist() == [2, 4]
+
+
+def test_funnel_progression_traces_are_typed_arrays():
+    frame = app.values_to_frame([["Date", "Total Leads", "Closed Sales"], ["2026-01-01", "4", "1"], ["2026-01-02", "6", "0"]])
+    frame = app.prepare_dated_frame(frame, ["Total Leads", "Closed Sales"]).convert_dtypes(dtype_backend="pyarrow")
+    spec = app.funnel_progression_json(app.frame_digest(frame), frame)
+    for trace in spec["data"]:
+        assert trace["x"].dtype.kind == "M"
+        # Plotly packs numeric arrays as typed buffers, object arrays would stay lists
+        assert trace["y"]["dtype"].startswith("i")
+
+
+@pytest.mark.parametrize("value, expected", [(None, 30), ("120", 120), ("2m", 30), ("0", 30), ("-5", 30), ("", 30)])
+def test_cache_ttl_from_env_falls_back_on_bad_values(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("METRICS_CACHE_TTL", raising=False)
+    else:
+        monkeypatch.setenv("METRICS_CACHE_TTL", value)
+    assert app.cache_ttl_from_env() == expected
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+import sheet_utils
+import streamlit_app_v2 as app
+
+
+def test_page_aggregates_count_stages():
+    df = app.prepare_leads(pd.DataFrame({
+        'Lead ID': ['1', '2', '3', '4'],
+        'Current Stage': ['Lead Collected', 'Opportunity', 'Contract Signed', 'Lost'],
+        'Lead Source': ['Web', 'Web', 'Referral', 'Web'],
+        'Agent Assigned': ['Ann', 'Ann', 'Bob', 'Unassigned'],
+    }))
+
+    stats = app.get_summary_stats(df)
+    assert (stats['qualified'], stats['won'], stats['lost'], stats['active']) == (2, 1, 1, 2)
+    funnel = app.get_funnel_metrics(df).set_index('Stage')['Count']
+    assert (funnel['Lead Collected'], funnel['Opportunity'], funnel['Negotiation']) == (1, 1, 0)
+    sources = app.get_source_performance(df).set_index('Lead Source')
+    assert sources.loc['Web', 'Total'] == 3
+    assert app.get_agent_performance(df)['Agent Assigned'].tolist() == ['Bob', 'Ann']
+
+
+def test_top_counts_folds_tail_into_other():
+    counts = pd.Series(range(20, 0, -1), index=[f"s{i}" for i in range(20)])
+    frame = app.top_counts(counts, 'Stage', 'Count')
+    assert len(frame) == app.PIE_MAX_SLICES
+    assert frame['Stage'].iloc[-1] == 'Other'
+    assert frame['Count'].sum() == counts.sum()
+
+
+def test_leads_cache_round_trips_mixed_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr(sheet_utils, "CACHE_DIR", str(tmp_path / "cache"))
+    path = app.leads_cache_path("https://docs.google.com/spreadsheets/d/abc")
+    df = pd.DataFrame({"Phone Number": [447700900123, "n/a", None], "Status": ["New", "Won", "Lost"]}, dtype=object)
+
+    app.store_cached_leads(path, "2026-01-01T00:00:00.000Z", df)
+
+    assert sorted(os.listdir(tmp_path / "cache")) == [os.path.basename(path), os.path.basename(path) + ".json"]
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    cached = app.load_cached_leads(path, "2026-01-01T00:00:00.000Z")
+    assert cached["Phone Number"].tolist()[:2] == ["447700900123", "n/a"]
+    assert app.load_cached_leads(path, "2026-02-01T00:00:00.000Z") is None
+
+
+def test_sheet_modified_time_only_swallows_api_errors():
+    class Sheet:
+        def get_lastUpdateTime(self):
+            raise app.gspread.exceptions.SpreadsheetNotFound
+
+    class Broken:
+        def get_lastUpdateTime(self):
+            raise ZeroDivisionError
+
+    assert app.sheet_modified_time(Sheet()) is None
+    assert app.sheet_modified_time(object()) is None
+    with pytest.raises(ZeroDivisionError):
+        app.sheet_modified_time(Broken())